@@ -1,17 +1,48 @@
+import bisect
+import math
 import os
-import spacy
 import re
 from edge_tts import Communicate
 import asyncio
 import json
+import shutil
+import subprocess
+import threading
+from limpieza_texto import MOTOR_AUDIO
+from cache_audio import CacheAudio, clave_audio
+from tiempos_audio import duracion_mp3, guardar_tiempos, unir_tiempos
+from modelo_duracion import ModeloDuracion
+from modelos_nlp import obtener_spacy
 
-nlp = spacy.load("es_core_news_sm")
+# Parámetros de la voz de Edge TTS (también forman parte de la clave de la caché)
+PARAMETROS_VOZ = {"rate": "-10%", "volume": "+10%", "pitch": "-10Hz"}
+
+# Caché de audios sintetizados (CACHE_AUDIO_DESACTIVADA=1 para ignorarla)
+cache_audio_desactivada = os.getenv("CACHE_AUDIO_DESACTIVADA", "0") == "1"
+cache_audio = CacheAudio(
+    os.getenv("CACHE_AUDIO_DIR", "historias/cache_audio"),
+    max_bytes=int(os.getenv("CACHE_AUDIO_MAX_MB", "2048")) * 1024 * 1024,
+)
+
+# Ritmo real de cada voz, calibrado con las duraciones de las síntesis anteriores
+modelo_duracion = ModeloDuracion(os.getenv("MODELO_DURACION_JSON", "historias/modelo_duracion_voz.json"))
+
+# Segmentos que se sintetizan a la vez y reintentos por segmento
+TTS_CONCURRENCIA = max(1, int(os.getenv("TTS_CONCURRENCIA", "6")))
+TTS_REINTENTOS = max(1, int(os.getenv("TTS_REINTENTOS", "3")))
+# Fundido entre segmentos al unir narracion.mp3 (0 = unión directa sin recodificar)
+TTS_CROSSFADE_MS = max(0, int(os.getenv("TTS_CROSSFADE_MS", "0")))
+
+# Bucle de eventos compartido por todas las historias (en un hilo propio)
+_bucle = None
+_bucle_lock = threading.Lock()
 
 def detectar_genero(texto):
     """
     Detecta el género del narrador basado en el texto utilizando spaCy.
+    Solo se comparan tokens, así que basta con el tokenizador.
     """
-    doc = nlp(texto)
+    doc = obtener_spacy("tokenizador")(texto)
     pronombres_masculinos = ["él", "su", "suyo", "suyos", "hombre", "señor", "chico"]
     pronombres_femeninos = ["ella", "su", "suya", "suyas", "mujer", "señora", "chica"]
 
@@ -24,102 +55,92 @@ def limpiar_texto_para_audio(texto):
     """
     Limpia el texto de marcadores y símbolos no deseados para el audio
     """
-    # Eliminar marcadores de formato
-    texto = texto.replace("[Texto mejorado aquí]", "")
-    texto = texto.replace("[Título mejorado]", "")
-    texto = texto.replace("[", "")
-    texto = texto.replace("]", "")
-    texto = texto.replace("*", "")
-    texto = texto.replace("#", "")
-    texto = texto.replace(">", "")
-    texto = texto.replace("-", "")
-    texto = texto.replace("Texto mejorado:", "")
-    texto = texto.replace("Título mejorado:", "")
-    
-    # Eliminar líneas de metadata específicas
-    lineas = texto.splitlines()
-    lineas_filtradas = []
-    for linea in lineas:
-        # Ignorar líneas con metadatos o formatos específicos
-        if ("Género detectado" in linea or 
-            "Recursos literarios" in linea or 
-            "Terror psicológico" in linea or
-            "misterio sobrenatural" in linea or
-            "Presagios" in linea or
-            "narrador poco fiable" in linea or
-            "atmósfera claustrofóbica" in linea or
-            "---" == linea.strip()):
-            continue
-        lineas_filtradas.append(linea)
-    
-    return "\n".join(lineas_filtradas).strip()
-
-def dividir_texto_en_segmentos(texto, max_duracion_segundos=300):
+    return MOTOR_AUDIO.limpiar(texto).strip()
+
+def dividir_texto_en_segmentos(texto, max_duracion_segundos=300, voz=None):
     """
     Divide el texto en segmentos más pequeños para generar audios de aproximadamente 5 minutos.
-    Intenta hacer el corte en puntos naturales como finales de párrafo o frases.
+    Los cortes se hacen siempre entre oraciones (o párrafos).
+    
+    La duración de cada oración se predice con el modelo calibrado de la voz
+    (ModeloDuracion) y se usa el mínimo número de segmentos que no supera
+    ``max_duracion_segundos`` de media. Las oraciones se reparten de forma que
+    los segmentos duren lo más parecido posible (mínima varianza) en lugar de
+    llenar cada segmento hasta el límite y dejar el último casi vacío.
     
     Args:
         texto: El texto a dividir
         max_duracion_segundos: Duración máxima deseada para cada segmento en segundos (por defecto 5 minutos)
+        voz: Voz de Edge TTS; sin voz se estiman 150 palabras por minuto
     
     Returns:
         Lista de segmentos de texto
     """
-    # Aproximadamente 150 palabras por minuto (ritmo de lectura promedio)
-    # Para 5 minutos, serían unas 750 palabras
-    palabras_por_segmento = max_duracion_segundos / 60 * 150
+    # Cada unidad es una oración con el separador que la sigue, para conservar
+    # los saltos de párrafo al volver a unirlas
+    partes = re.split(r'(?<=[.!?])(\s+)', texto)
+    unidades = []
+    for i in range(0, len(partes), 2):
+        unidad = partes[i] + (partes[i + 1] if i + 1 < len(partes) else "")
+        if unidad.strip():
+            unidades.append(unidad)
+    if not unidades:
+        return []
     
-    # Dividir el texto en párrafos
-    parrafos = texto.split('\n\n')
+    clave_voz = ModeloDuracion.clave_voz(voz, PARAMETROS_VOZ["rate"]) if voz else None
+    duraciones = [modelo_duracion.predecir(clave_voz, unidad) for unidad in unidades]
+    num_segmentos = min(len(unidades), max(1, math.ceil(sum(duraciones) / max_duracion_segundos)))
     
-    segmentos = []
-    segmento_actual = []
-    palabras_en_segmento = 0
+    cortes = _repartir_equilibrado(duraciones, num_segmentos)
+    return [
+        "".join(unidades[inicio:fin]).strip()
+        for inicio, fin in zip([0] + cortes, cortes + [len(unidades)])
+    ]
+
+def _repartir_equilibrado(duraciones, num_grupos):
+    """
+    Reparte la secuencia de duraciones en ``num_grupos`` grupos consecutivos
+    minimizando la suma de cuadrados de sus duraciones (equivale a minimizar
+    la varianza, ya que el total es fijo). Programación dinámica limitada a
+    grupos de hasta el doble de la duración media.
     
-    for parrafo in parrafos:
-        palabras_parrafo = len(parrafo.split())
-        
-        # Si añadir este párrafo excede el límite y ya tenemos contenido
-        if palabras_en_segmento + palabras_parrafo > palabras_por_segmento and segmento_actual:
-            segmentos.append('\n\n'.join(segmento_actual))
-            segmento_actual = [parrafo]
-            palabras_en_segmento = palabras_parrafo
-        else:
-            segmento_actual.append(parrafo)
-            palabras_en_segmento += palabras_parrafo
-    
-    # Añadir el último segmento si quedó algo
-    if segmento_actual:
-        segmentos.append('\n\n'.join(segmento_actual))
-    
-    # Si algún segmento único es muy largo, dividirlo por oraciones
-    segmentos_finales = []
-    for segmento in segmentos:
-        if len(segmento.split()) > palabras_por_segmento * 1.2:  # Si excede por más del 20%
-            oraciones = re.split(r'(?<=[.!?])\s+', segmento)
-            segmento_oracion = []
-            palabras_en_segmento = 0
-            
-            for oracion in oraciones:
-                palabras_oracion = len(oracion.split())
-                
-                if palabras_en_segmento + palabras_oracion > palabras_por_segmento and segmento_oracion:
-                    segmentos_finales.append(' '.join(segmento_oracion))
-                    segmento_oracion = [oracion]
-                    palabras_en_segmento = palabras_oracion
-                else:
-                    segmento_oracion.append(oracion)
-                    palabras_en_segmento += palabras_oracion
-            
-            if segmento_oracion:
-                segmentos_finales.append(' '.join(segmento_oracion))
-        else:
-            segmentos_finales.append(segmento)
-    
-    return segmentos_finales
-
-async def generar_audio_segmento(texto, ruta_salida, voz, indice=0):
+    Returns:
+        Índices donde empieza cada grupo a partir del segundo
+    """
+    n = len(duraciones)
+    acumulado = [0.0]
+    for duracion in duraciones:
+        acumulado.append(acumulado[-1] + duracion)
+    limite = 2 * acumulado[-1] / num_grupos
+    
+    infinito = float("inf")
+    coste = [0.0] + [infinito] * n
+    origenes = []
+    for _ in range(num_grupos):
+        nuevo = [infinito] * (n + 1)
+        origen = [0] * (n + 1)
+        for fin in range(1, n + 1):
+            # Primer inicio posible para no superar el límite (siempre cabe una unidad)
+            inicio_min = min(fin - 1, bisect.bisect_left(acumulado, acumulado[fin] - limite))
+            for inicio in range(inicio_min, fin):
+                if coste[inicio] == infinito:
+                    continue
+                valor = coste[inicio] + (acumulado[fin] - acumulado[inicio]) ** 2
+                if valor < nuevo[fin]:
+                    nuevo[fin] = valor
+                    origen[fin] = inicio
+        coste = nuevo
+        origenes.append(origen)
+    
+    # Reconstruir los cortes desde el final
+    cortes = []
+    fin = n
+    for origen in reversed(origenes):
+        fin = origen[fin]
+        cortes.append(fin)
+    return sorted(cortes)[1:]
+
+async def generar_audio_segmento(texto, ruta_salida, voz, indice=0, reintentos=None, al_recibir_audio=None):
     """
     Genera un archivo de audio para un segmento de texto específico
     
@@ -128,26 +149,169 @@ async def generar_audio_segmento(texto, ruta_salida, voz, indice=0):
         ruta_salida: Ruta base donde guardar el archivo
         voz: Voz a utilizar para el TTS
         indice: Índice del segmento para nombrar el archivo
+        reintentos: Intentos antes de rendirse (por defecto TTS_REINTENTOS)
+        al_recibir_audio: Función que recibe cada fragmento de audio en cuanto
+            llega de Edge TTS (o el audio completo si sale de la caché)
     
     Returns:
         Ruta del archivo de audio generado
     """
     nombre_archivo = f"narracion_parte_{indice+1}.mp3"
     ruta_archivo = os.path.join(ruta_salida, nombre_archivo)
+    ruta_tiempos = ruta_tiempos_segmento(ruta_archivo)
+    reintentos = reintentos or TTS_REINTENTOS
     
-    communicate = Communicate(texto, 
-                            voice=voz,
-                            rate="-10%",
-                            volume="+10%",
-                            pitch="-10Hz")
+    # Si el mismo texto ya se sintetizó con la misma voz, reutilizar el audio
+    # y sus tiempos por palabra
+    clave = clave_audio(texto, voz, **PARAMETROS_VOZ)
+    if (
+        not cache_audio_desactivada
+        and cache_audio.obtener(f"{clave}-tiempos", ruta_tiempos)
+        and cache_audio.obtener(clave, ruta_archivo)
+    ):
+        print(f"♻️ Audio parte {indice+1} reutilizado de la caché")
+        if al_recibir_audio:
+            with open(ruta_archivo, "rb") as f:
+                al_recibir_audio(f.read())
+        return nombre_archivo
     
-    print(f"🔄 Generando audio parte {indice+1}...")
-    await communicate.save(ruta_archivo)
+    for intento in range(1, reintentos + 1):
+        communicate = Communicate(texto, voice=voz, boundary="WordBoundary", **PARAMETROS_VOZ)
+        
+        print(f"🔄 Generando audio parte {indice+1}...")
+        # Se escribe en un temporal para no dejar un mp3 a medias si falla
+        temporal = f"{ruta_archivo}.tmp"
+        palabras, inicios, duraciones = [], [], []
+        entregado = False
+        try:
+            with open(temporal, "wb") as f:
+                async for mensaje in communicate.stream():
+                    if mensaje["type"] == "audio":
+                        f.write(mensaje["data"])
+                        if al_recibir_audio:
+                            al_recibir_audio(mensaje["data"])
+                            entregado = True
+                    elif mensaje["type"] == "WordBoundary":
+                        # Edge TTS da los tiempos en unidades de 100 ns
+                        palabras.append(mensaje["text"])
+                        inicios.append(mensaje["offset"] / 10000)
+                        duraciones.append(mensaje["duration"] / 10000)
+            os.replace(temporal, ruta_archivo)
+            guardar_tiempos(ruta_tiempos, palabras, inicios, duraciones)
+            modelo_duracion.registrar(
+                ModeloDuracion.clave_voz(voz, PARAMETROS_VOZ["rate"]),
+                texto,
+                duracion_mp3(ruta_archivo) / 1000,
+            )
+            cache_audio.guardar(clave, ruta_archivo)
+            cache_audio.guardar(f"{clave}-tiempos", ruta_tiempos)
+            break
+        except Exception as e:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            # Si ya se entregó parte del audio, repetir el segmento lo duplicaría
+            if intento == reintentos or entregado:
+                print(f"❌ Error generando el audio parte {indice+1}: {e}")
+                raise
+            espera = 2 ** intento
+            print(f"⚠️ Error en el audio parte {indice+1} (intento {intento}/{reintentos}): {e}. Reintentando en {espera}s...")
+            await asyncio.sleep(espera)
     print(f"✅ Audio parte {indice+1} guardado en {ruta_archivo}")
     
     return nombre_archivo
 
-async def texto_a_audio_edge(historia_id):
+def ruta_tiempos_segmento(ruta_audio):
+    """Archivo de tiempos por palabra asociado a un mp3"""
+    return f"{os.path.splitext(ruta_audio)[0]}.tiempos.json"
+
+async def generar_segmentos_concurrentes(segmentos, ruta_salida, voz, concurrencia=None):
+    """
+    Sintetiza todos los segmentos a la vez, con un máximo de ``concurrencia``
+    conexiones simultáneas a Edge TTS
+    
+    Args:
+        segmentos: Lista de textos
+        ruta_salida: Carpeta donde guardar los archivos
+        voz: Voz a utilizar para el TTS
+        concurrencia: Segmentos simultáneos (por defecto TTS_CONCURRENCIA)
+    
+    Returns:
+        Nombres de los archivos en el mismo orden que los segmentos
+    """
+    semaforo = asyncio.Semaphore(concurrencia or TTS_CONCURRENCIA)
+
+    async def generar(indice, segmento):
+        async with semaforo:
+            return await generar_audio_segmento(segmento, ruta_salida, voz, indice)
+
+    # gather conserva el orden de los segmentos aunque terminen desordenados
+    return await asyncio.gather(*(generar(i, segmento) for i, segmento in enumerate(segmentos)))
+
+def _escribir_en_todos(destinos, datos):
+    for destino in destinos:
+        destino.write(datos)
+
+async def generar_segmentos_en_flujo(segmentos, ruta_salida, voz, destinos, concurrencia=None):
+    """
+    Sintetiza los segmentos a la vez y escribe la narración en ``destinos`` a
+    medida que llega, en el orden del texto: el audio del segmento en curso se
+    escribe al recibirse y el de los siguientes se acumula hasta que le toca.
+    
+    Args:
+        segmentos: Lista de textos
+        ruta_salida: Carpeta donde guardar los archivos de cada segmento
+        voz: Voz a utilizar para el TTS
+        destinos: Archivos binarios abiertos (p. ej. la entrada de ffmpeg)
+        concurrencia: Segmentos simultáneos (por defecto TTS_CONCURRENCIA)
+    
+    Returns:
+        Nombres de los archivos en el mismo orden que los segmentos
+    """
+    semaforo = asyncio.Semaphore(concurrencia or TTS_CONCURRENCIA)
+    colas = [asyncio.Queue() for _ in segmentos]
+
+    async def generar(indice, segmento):
+        try:
+            async with semaforo:
+                return await generar_audio_segmento(
+                    segmento, ruta_salida, voz, indice, al_recibir_audio=colas[indice].put_nowait
+                )
+        finally:
+            colas[indice].put_nowait(None)  # Fin del segmento
+
+    async def escribir():
+        for cola in colas:
+            while True:
+                fragmento = await cola.get()
+                if fragmento is None:
+                    break
+                # La escritura en una tubería puede bloquear si ffmpeg va por detrás
+                await asyncio.to_thread(_escribir_en_todos, destinos, fragmento)
+
+    # Un error en cualquier segmento (o al escribir) cancela el resto
+    tareas = [asyncio.ensure_future(generar(i, segmento)) for i, segmento in enumerate(segmentos)]
+    tareas.append(asyncio.ensure_future(escribir()))
+    try:
+        resultados = await asyncio.gather(*tareas)
+    except BaseException:
+        for tarea in tareas:
+            tarea.cancel()
+        raise
+    return resultados[:-1]
+
+async def texto_a_audio_edge(historia_id, destino=None):
+    """
+    Genera narracion.mp3, sus segmentos y los tiempos por palabra de una historia
+    
+    Args:
+        historia_id: ID de la historia
+        destino: Archivo binario abierto (p. ej. la entrada de un ffmpeg) donde
+            escribir la narración mientras se sintetiza. En ese caso los
+            segmentos se unen sin fundido.
+    
+    Returns:
+        Ruta de narracion.mp3 o None si no hay texto
+    """
     ruta = f"historias/{historia_id}"
     archivo_texto = f"{ruta}/historia.txt"
 
@@ -167,23 +331,51 @@ async def texto_a_audio_edge(historia_id):
     voz = "es-ES-ElviraNeural" if genero == "femenino" else "es-ES-AlvaroNeural"
 
     # Dividir el texto en segmentos de aproximadamente 5 minutos
-    segmentos = dividir_texto_en_segmentos(texto_limpio)
+    segmentos = dividir_texto_en_segmentos(texto_limpio, voz=voz)
     
     # Crear carpeta para los segmentos de audio si no existe
     carpeta_segmentos = f"{ruta}/segmentos_audio"
     os.makedirs(carpeta_segmentos, exist_ok=True)
     
-    # Generar un archivo de audio para cada segmento
-    archivos_audio = []
+    archivo_audio_completo = f"{ruta}/narracion.mp3"
+    if destino is None:
+        # Generar un archivo de audio para cada segmento (en paralelo)
+        archivos_audio = await generar_segmentos_concurrentes(segmentos, carpeta_segmentos, voz)
+        
+        # El audio completo se arma con los segmentos, sin volver a sintetizar el texto
+        rutas_audio = [os.path.join(carpeta_segmentos, nombre) for nombre in archivos_audio]
+        await asyncio.to_thread(unir_segmentos_audio, rutas_audio, archivo_audio_completo)
+        crossfade_ms = TTS_CROSSFADE_MS if len(rutas_audio) > 1 else 0
+    else:
+        # narracion.mp3 se escribe a la vez que el audio sale hacia el destino
+        temporal = f"{archivo_audio_completo}.tmp"
+        try:
+            with open(temporal, "wb") as narracion:
+                archivos_audio = await generar_segmentos_en_flujo(
+                    segmentos, carpeta_segmentos, voz, [destino, narracion]
+                )
+        except BaseException:
+            os.remove(temporal)
+            raise
+        os.replace(temporal, archivo_audio_completo)
+        rutas_audio = [os.path.join(carpeta_segmentos, nombre) for nombre in archivos_audio]
+        crossfade_ms = 0
     
-    for i, segmento in enumerate(segmentos):
-        nombre_archivo = await generar_audio_segmento(segmento, carpeta_segmentos, voz, i)
-        archivos_audio.append(nombre_archivo)
+    # Tiempos por palabra en la línea de tiempo de narracion.mp3
+    archivo_tiempos = f"{ruta}/tiempos_narracion.json"
+    await asyncio.to_thread(
+        unir_tiempos,
+        [ruta_tiempos_segmento(ruta_audio) for ruta_audio in rutas_audio],
+        [duracion_mp3(ruta_audio) for ruta_audio in rutas_audio],
+        archivo_tiempos,
+        crossfade_ms,
+    )
     
     # Guardar metadata sobre los segmentos
     metadata = {
         "titulo": titulo,
         "segmentos_audio": archivos_audio,
+        "tiempos_narracion": os.path.basename(archivo_tiempos),
         "genero_narrador": genero,
         "voz_utilizada": voz
     }
@@ -191,17 +383,81 @@ async def texto_a_audio_edge(historia_id):
     with open(f"{ruta}/metadata_audio.json", "w", encoding="utf-8") as f:
         json.dump(metadata, f, ensure_ascii=False, indent=4)
     
-    # También generar un único archivo de audio completo para compatibilidad
-    communicate = Communicate(texto_limpio, 
-                            voice=voz,
-                            rate="-10%",
-                            volume="+10%",
-                            pitch="-10Hz")
+    return archivo_audio_completo
 
-    archivo_audio_completo = f"{ruta}/narracion.mp3"
-    print("🔄 Generando audio completo...")
-    await communicate.save(archivo_audio_completo)
-    print(f"✅ Audio completo guardado en {archivo_audio_completo}")
+def unir_segmentos_audio(rutas_segmentos, archivo_salida, crossfade_ms=None):
+    """
+    Une los mp3 de los segmentos en un único archivo de audio
+    
+    Sin fundido se usa el demuxer concat de ffmpeg con copia de flujo: no se
+    recodifica nada y la duración es exactamente la suma de los segmentos. Con
+    fundido se encadenan filtros acrossfade y se recodifica en mp3.
+    
+    Args:
+        rutas_segmentos: Rutas de los mp3 en orden
+        archivo_salida: Ruta del mp3 completo
+        crossfade_ms: Milisegundos de fundido entre segmentos (por defecto
+            TTS_CROSSFADE_MS)
+    """
+    if crossfade_ms is None:
+        crossfade_ms = TTS_CROSSFADE_MS
+    print("🔄 Uniendo los segmentos en el audio completo...")
+    
+    if len(rutas_segmentos) == 1:
+        shutil.copyfile(rutas_segmentos[0], archivo_salida)
+    elif crossfade_ms > 0:
+        entradas = []
+        for ruta_segmento in rutas_segmentos:
+            entradas += ["-i", ruta_segmento]
+        filtros = []
+        anterior = "[0:a]"
+        for i in range(1, len(rutas_segmentos)):
+            salida = f"[a{i}]"
+            filtros.append(f"{anterior}[{i}:a]acrossfade=d={crossfade_ms / 1000}:c1=tri:c2=tri{salida}")
+            anterior = salida
+        subprocess.run(
+            ["ffmpeg", "-y", "-v", "error", *entradas,
+             "-filter_complex", ";".join(filtros), "-map", anterior,
+             "-c:a", "libmp3lame", "-q:a", "4", archivo_salida],
+            check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+    else:
+        lista = f"{archivo_salida}.concat.txt"
+        with open(lista, "w", encoding="utf-8") as f:
+            for ruta_segmento in rutas_segmentos:
+                ruta_absoluta = os.path.abspath(ruta_segmento).replace("'", "'\\''")
+                f.write(f"file '{ruta_absoluta}'\n")
+        try:
+            subprocess.run(
+                ["ffmpeg", "-y", "-v", "error", "-f", "concat", "-safe", "0",
+                 "-i", lista, "-c", "copy", archivo_salida],
+                check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            )
+        except (OSError, subprocess.CalledProcessError) as e:
+            # Edge TTS entrega tramas MP3 sin cabeceras: unirlas byte a byte
+            # también da un archivo válido y sin huecos
+            print(f"⚠️ No se pudo unir con ffmpeg ({e}). Uniendo los archivos directamente...")
+            with open(archivo_salida, "wb") as salida:
+                for ruta_segmento in rutas_segmentos:
+                    with open(ruta_segmento, "rb") as entrada:
+                        shutil.copyfileobj(entrada, salida)
+        finally:
+            os.remove(lista)
+    
+    print(f"✅ Audio completo guardado en {archivo_salida}")
+
+def _obtener_bucle():
+    """
+    Devuelve el bucle de eventos compartido, creándolo la primera vez en un
+    hilo en segundo plano, para no crear y cerrar un bucle por historia
+    """
+    global _bucle
+    with _bucle_lock:
+        if _bucle is None or _bucle.is_closed():
+            _bucle = asyncio.new_event_loop()
+            threading.Thread(target=_bucle.run_forever, name="bucle-tts", daemon=True).start()
+    return _bucle
 
-def texto_a_audio(historia_id):
-    asyncio.run(texto_a_audio_edge(historia_id))
+def texto_a_audio(historia_id, destino=None):
+    futuro = asyncio.run_coroutine_threadsafe(texto_a_audio_edge(historia_id, destino), _obtener_bucle())
+    return futuro.result()
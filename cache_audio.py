@@ -0,0 +1,125 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+
+def clave_audio(texto, voz, **parametros):
+    """Calcula la clave de contenido de una síntesis de voz
+
+    El texto se normaliza (espacios colapsados) para que diferencias de
+    formato que no cambian el audio no invaliden la caché.
+    """
+    texto_normalizado = " ".join((texto or "").split())
+    partes = [texto_normalizado, voz or ""]
+    partes += [f"{nombre}={parametros[nombre]}" for nombre in sorted(parametros)]
+    return hashlib.sha256("\0".join(partes).encode("utf-8")).hexdigest()
+
+
+def _enlazar_o_copiar(origen, destino):
+    """Crea un enlace duro de origen en destino o, si no se puede, lo copia"""
+    temporal = f"{destino}.tmp"
+    if os.path.exists(temporal):
+        os.remove(temporal)
+    try:
+        os.link(origen, temporal)
+    except OSError:
+        # Otro sistema de archivos o sin soporte de enlaces duros
+        shutil.copyfile(origen, temporal)
+    os.replace(temporal, destino)
+
+
+class CacheAudio:
+    """Caché persistente de audios sintetizados direccionada por contenido
+
+    Los mp3 (y sus archivos de tiempos por palabra) se guardan en ``carpeta``
+    con el hash del texto y los parámetros de la voz como nombre, y un índice
+    SQLite lleva su tamaño y último uso. Si el total supera ``max_bytes`` se
+    eliminan los menos usados recientemente. Los aciertos se enlazan (o copian) en la carpeta de la
+    historia en lugar de volver a sintetizarse.
+    """
+
+    def __init__(self, carpeta, max_bytes=2 * 1024 * 1024 * 1024):
+        os.makedirs(carpeta, exist_ok=True)
+        self.carpeta = carpeta
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(
+            os.path.join(carpeta, "indice.db"), timeout=30, check_same_thread=False
+        )
+        with self._lock, self._conexion:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute(
+                """
+                CREATE TABLE IF NOT EXISTS audios (
+                    clave TEXT PRIMARY KEY,
+                    tamano INTEGER NOT NULL,
+                    creado REAL NOT NULL,
+                    ultimo_uso REAL NOT NULL
+                )
+                """
+            )
+            self._conexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_audios_uso ON audios (ultimo_uso)"
+            )
+
+    def _ruta(self, clave):
+        return os.path.join(self.carpeta, clave[:2], clave)
+
+    def obtener(self, clave, destino):
+        """Coloca el audio guardado en ``destino``
+
+        Returns:
+            True si había un audio para la clave, False en caso contrario
+        """
+        ruta = self._ruta(clave)
+        with self._lock, self._conexion:
+            fila = self._conexion.execute(
+                "SELECT 1 FROM audios WHERE clave = ?", (clave,)
+            ).fetchone()
+            if fila is None:
+                return False
+            if not os.path.exists(ruta):
+                self._conexion.execute("DELETE FROM audios WHERE clave = ?", (clave,))
+                return False
+            self._conexion.execute(
+                "UPDATE audios SET ultimo_uso = ? WHERE clave = ?", (time.time(), clave)
+            )
+            _enlazar_o_copiar(ruta, destino)
+        return True
+
+    def guardar(self, clave, origen):
+        """Guarda el audio de ``origen`` y aplica el límite de tamaño"""
+        ruta = self._ruta(clave)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        ahora = time.time()
+        with self._lock, self._conexion:
+            _enlazar_o_copiar(origen, ruta)
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO audios (clave, tamano, creado, ultimo_uso) "
+                "VALUES (?, ?, ?, ?)",
+                (clave, os.path.getsize(ruta), ahora, ahora),
+            )
+            total = self._conexion.execute(
+                "SELECT COALESCE(SUM(tamano), 0) FROM audios"
+            ).fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            # Eliminar los menos usados hasta quedar por debajo del límite
+            for clave_antigua, tamano_antiguo in self._conexion.execute(
+                "SELECT clave, tamano FROM audios ORDER BY ultimo_uso"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                self._conexion.execute("DELETE FROM audios WHERE clave = ?", (clave_antigua,))
+                try:
+                    os.remove(self._ruta(clave_antigua))
+                except OSError:
+                    pass
+                total -= tamano_antiguo
+
+    def cerrar(self):
+        with self._lock:
+            self._conexion.close()
@@ -0,0 +1,99 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+def clave_respuesta(proveedor, modelo, version_prompt, titulo, texto):
+    """Calcula la clave de contenido de una petición al LLM"""
+    contenido = "\0".join([proveedor, modelo, str(version_prompt), titulo or "", texto or ""])
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+class CacheLLM:
+    """Caché persistente de respuestas del LLM direccionada por contenido
+
+    Las respuestas se guardan en SQLite bajo el hash de
+    (proveedor, modelo, versión del prompt, título, texto). Las entradas
+    caducan tras ``ttl_segundos`` y, si el total supera ``max_bytes``, se
+    eliminan las menos usadas recientemente.
+    """
+
+    def __init__(self, ruta_db, ttl_segundos=30 * 24 * 3600, max_bytes=200 * 1024 * 1024):
+        carpeta = os.path.dirname(ruta_db)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self.ruta_db = ruta_db
+        self.ttl_segundos = ttl_segundos
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta_db, timeout=30, check_same_thread=False)
+        with self._lock, self._conexion:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute(
+                """
+                CREATE TABLE IF NOT EXISTS respuestas (
+                    clave TEXT PRIMARY KEY,
+                    proveedor TEXT NOT NULL,
+                    modelo TEXT NOT NULL,
+                    respuesta TEXT NOT NULL,
+                    tamano INTEGER NOT NULL,
+                    creado REAL NOT NULL,
+                    ultimo_uso REAL NOT NULL
+                )
+                """
+            )
+            self._conexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_respuestas_uso ON respuestas (ultimo_uso)"
+            )
+
+    def obtener(self, clave):
+        """Devuelve la respuesta guardada o None si no existe o ha caducado"""
+        ahora = time.time()
+        with self._lock, self._conexion:
+            fila = self._conexion.execute(
+                "SELECT respuesta, creado FROM respuestas WHERE clave = ?", (clave,)
+            ).fetchone()
+            if fila is None:
+                return None
+            respuesta, creado = fila
+            if ahora - creado > self.ttl_segundos:
+                self._conexion.execute("DELETE FROM respuestas WHERE clave = ?", (clave,))
+                return None
+            self._conexion.execute(
+                "UPDATE respuestas SET ultimo_uso = ? WHERE clave = ?", (ahora, clave)
+            )
+            return respuesta
+
+    def guardar(self, clave, proveedor, modelo, respuesta):
+        """Guarda una respuesta y aplica la caducidad y el límite de tamaño"""
+        ahora = time.time()
+        tamano = len(respuesta.encode("utf-8"))
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO respuestas "
+                "(clave, proveedor, modelo, respuesta, tamano, creado, ultimo_uso) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (clave, proveedor, modelo, respuesta, tamano, ahora, ahora),
+            )
+            self._conexion.execute(
+                "DELETE FROM respuestas WHERE creado < ?", (ahora - self.ttl_segundos,)
+            )
+            total = self._conexion.execute(
+                "SELECT COALESCE(SUM(tamano), 0) FROM respuestas"
+            ).fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            # Eliminar las menos usadas hasta quedar por debajo del límite
+            for clave_antigua, tamano_antiguo in self._conexion.execute(
+                "SELECT clave, tamano FROM respuestas ORDER BY ultimo_uso"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                self._conexion.execute("DELETE FROM respuestas WHERE clave = ?", (clave_antigua,))
+                total -= tamano_antiguo
+
+    def cerrar(self):
+        with self._lock:
+            self._conexion.close()
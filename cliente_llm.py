@@ -0,0 +1,179 @@
+import json
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def estimar_tokens(texto):
+    """Estimación rápida de tokens (unos 4 caracteres por token)"""
+    return max(1, len(texto or "") // 4)
+
+
+class CuboTokens:
+    """Cubo de tokens para limitar peticiones o tokens por minuto
+
+    Cada consumo se descuenta en el momento aunque el saldo quede negativo y
+    el hilo espera lo necesario para saldar la deuda, de modo que las esperas
+    se reparten por orden de llegada sin bucles de sondeo.
+
+    Args:
+        por_minuto: Unidades que se recuperan por minuto (también es la
+            capacidad máxima acumulable)
+    """
+
+    def __init__(self, por_minuto):
+        self.capacidad = float(por_minuto)
+        self.por_segundo = self.capacidad / 60
+        self._saldo = self.capacidad
+        self._ultima = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _recargar(self):
+        ahora = time.monotonic()
+        self._saldo = min(self.capacidad, self._saldo + (ahora - self._ultima) * self.por_segundo)
+        self._ultima = ahora
+
+    def consumir(self, cantidad=1):
+        """Descuenta ``cantidad`` y espera si no hay saldo; devuelve los segundos esperados"""
+        with self._lock:
+            self._recargar()
+            self._saldo -= min(cantidad, self.capacidad)
+            espera = max(0.0, -self._saldo / self.por_segundo)
+        if espera:
+            time.sleep(espera)
+        return espera
+
+    def ajustar(self, diferencia):
+        """Corrige el saldo cuando el consumo real difiere del estimado"""
+        with self._lock:
+            self._recargar()
+            self._saldo = min(self.capacidad, self._saldo - diferencia)
+
+
+class ClienteLLM:
+    """Cliente de chat compatible con la API de OpenAI para varios hilos
+
+    Reutiliza las conexiones HTTP de una sesión con un pool de
+    ``conexiones`` conexiones, así varias reescrituras simultáneas no abren
+    una conexión TLS nueva cada vez. Antes de cada petición se respetan los
+    límites de peticiones por minuto (``rpm``) y tokens por minuto (``tpm``)
+    del proveedor con cubos de tokens; 0 desactiva el límite.
+
+    El tiempo esperado en la cola de los límites y la latencia del proveedor
+    se registran por separado en ``estadisticas``: la latencia como
+    ``nombre:clase`` (la clase de prompt que indica quien llama, para no
+    mezclar títulos cortos con historias completas) y la espera como
+    ``nombre:cola``. La latencia se mide desde que la petición sale.
+
+    Args:
+        nombre: Nombre del proveedor (para mensajes y estadísticas)
+        url: URL completa del endpoint chat/completions
+        api_key: Clave de la API
+        modelo: Modelo que se pide
+        rpm: Peticiones por minuto permitidas
+        tpm: Tokens por minuto permitidos
+        conexiones: Tamaño del pool de conexiones
+        estadisticas: EstadisticasLatencia opcional
+    """
+
+    def __init__(
+        self,
+        nombre,
+        url,
+        api_key,
+        modelo,
+        rpm=0,
+        tpm=0,
+        conexiones=8,
+        timeout=600,
+        estadisticas=None,
+    ):
+        self.nombre = nombre
+        self.url = url
+        self.modelo = modelo
+        self.timeout = timeout
+        self.estadisticas = estadisticas
+        self.limite_peticiones = CuboTokens(rpm) if rpm > 0 else None
+        self.limite_tokens = CuboTokens(tpm) if tpm > 0 else None
+        self.sesion = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=conexiones)
+        self.sesion.mount("https://", adaptador)
+        self.sesion.mount("http://", adaptador)
+        self.sesion.headers.update(
+            {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+        )
+
+    def _esperar_turno(self, prompt):
+        """Espera a que los límites permitan la petición
+
+        Returns:
+            Tupla (segundos esperados, tokens reservados)
+        """
+        # La reescritura devuelve un texto de longitud parecida a la entrada
+        reservados = estimar_tokens(prompt) * 2
+        inicio = time.monotonic()
+        if self.limite_peticiones:
+            self.limite_peticiones.consumir()
+        if self.limite_tokens:
+            self.limite_tokens.consumir(reservados)
+        espera = time.monotonic() - inicio
+        if self.estadisticas is not None:
+            self.estadisticas.registrar(f"{self.nombre}:cola", espera)
+        if espera >= 1:
+            print(f"⏳ {self.nombre}: {espera:.1f}s en cola por los límites de peticiones")
+        return espera, reservados
+
+    def _datos(self, prompt, stream=False):
+        datos = {"model": self.modelo, "messages": [{"role": "user", "content": prompt}]}
+        if stream:
+            datos["stream"] = True
+        return datos
+
+    def clave_latencia(self, clase=None):
+        """Clave de las estadísticas de latencia para una clase de prompt"""
+        return f"{self.nombre}:{clase}" if clase else self.nombre
+
+    def completar(self, prompt, clase=None, al_despachar=None):
+        """Envía el prompt y devuelve el texto de la respuesta o None si falla
+
+        Args:
+            prompt: Texto del mensaje
+            clase: Clase de prompt con la que se registra la latencia
+            al_despachar: Función opcional que se llama justo antes de
+                enviar la petición, tras la espera por los límites
+        """
+        _, reservados = self._esperar_turno(prompt)
+        if al_despachar:
+            al_despachar()
+        inicio = time.monotonic()
+        respuesta = self.sesion.post(self.url, json=self._datos(prompt), timeout=self.timeout)
+        if respuesta.status_code != 200:
+            print(f"Error con {self.nombre}: código de estado {respuesta.status_code}")
+            return None
+        datos = respuesta.json()
+        if self.estadisticas is not None:
+            self.estadisticas.registrar(self.clave_latencia(clase), time.monotonic() - inicio)
+
+        usados = (datos.get("usage") or {}).get("total_tokens")
+        if self.limite_tokens and usados:
+            self.limite_tokens.ajustar(usados - reservados)
+        return datos["choices"][0]["message"]["content"]
+
+    def completar_stream(self, prompt):
+        """Igual que completar pero devuelve los fragmentos según llegan"""
+        self._esperar_turno(prompt)
+        with self.sesion.post(
+            self.url, json=self._datos(prompt, stream=True), timeout=self.timeout, stream=True
+        ) as respuesta:
+            respuesta.raise_for_status()
+            for linea in respuesta.iter_lines(decode_unicode=True):
+                if not linea or not linea.startswith("data:"):
+                    continue
+                carga = linea[5:].strip()
+                if carga == "[DONE]":
+                    break
+                opciones = json.loads(carga).get("choices") or []
+                if opciones and opciones[0].get("delta", {}).get("content"):
+                    yield opciones[0]["delta"]["content"]
@@ -0,0 +1,245 @@
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import requests
+
+TAMANO_LOTE_INFO = 100  # Máximo de fullnames por petición a /api/info
+
+
+def post_desde_json(datos):
+    """Crea un post ligero a partir del JSON de un listado o un volcado
+
+    Expone los mismos atributos que se usan de los Submission de PRAW
+    (id, fullname, title, selftext, score, upvote_ratio, link_flair_text...)
+    para que siga el mismo camino de procesamiento.
+    """
+    datos = datos.get("data", datos)
+    post_id = datos.get("id", "")
+    return SimpleNamespace(
+        id=post_id,
+        fullname=datos.get("name") or f"t3_{post_id}",
+        title=datos.get("title", ""),
+        selftext=datos.get("selftext", ""),
+        score=datos.get("score", 0),
+        upvote_ratio=datos.get("upvote_ratio", 1.0),
+        link_flair_text=datos.get("link_flair_text"),
+        subreddit=datos.get("subreddit", ""),
+        created_utc=datos.get("created_utc", 0),
+        removed_by_category=datos.get("removed_by_category"),
+    )
+
+
+def post_valido(post):
+    """Indica si el post sigue disponible y tiene texto"""
+    texto = getattr(post, "selftext", "") or ""
+    if texto.strip() in ("", "[removed]", "[deleted]"):
+        return False
+    return not getattr(post, "removed_by_category", None)
+
+
+def refrescar_en_lote(reddit, posts):
+    """Valida y actualiza posts pidiendo a Reddit 100 fullnames por petición
+
+    Usa ``reddit.info`` en lugar de cargar cada Submission perezosamente, lo
+    que reduce las peticiones a una por cada 100 posts. Los posts borrados o
+    eliminados por moderación se descartan y el resto se devuelven con los
+    datos actuales (puntuación, ratio de votos, flair) y en el mismo orden.
+    """
+    posts = list(posts)
+    actualizados = {}
+    for i in range(0, len(posts), TAMANO_LOTE_INFO):
+        fullnames = [post.fullname for post in posts[i : i + TAMANO_LOTE_INFO]]
+        try:
+            for post in reddit.info(fullnames=fullnames):
+                actualizados[post.fullname] = post
+        except Exception as e:
+            print(f"⚠️ Error validando posts en lote: {e}")
+            # Sin respuesta se conservan los datos que ya teníamos
+            for post in posts[i : i + TAMANO_LOTE_INFO]:
+                actualizados.setdefault(post.fullname, post)
+    validos = [
+        actualizados[post.fullname]
+        for post in posts
+        if post.fullname in actualizados and post_valido(actualizados[post.fullname])
+    ]
+    if len(validos) < len(posts):
+        print(f"🧹 {len(posts) - len(validos)} posts descartados al validar en lote")
+    return validos
+
+
+class ControlLimiteReddit:
+    """Sigue las cabeceras X-Ratelimit-* de Reddit y reparte las peticiones
+
+    Con las peticiones restantes y los segundos hasta el reinicio de la
+    ventana calcula la pausa que permite agotar el cupo justo al final, de
+    modo que se obtienen el máximo de posts por minuto sin recibir 429.
+    """
+
+    def __init__(self, margen=2):
+        self.margen = margen
+        self.restantes = None
+        self.reinicio = None
+        self.usadas = None
+        self._actualizado = 0.0
+        self._lock = threading.Lock()
+
+    def actualizar(self, cabeceras):
+        with self._lock:
+            try:
+                if "X-Ratelimit-Remaining" in cabeceras:
+                    self.restantes = float(cabeceras["X-Ratelimit-Remaining"])
+                if "X-Ratelimit-Reset" in cabeceras:
+                    self.reinicio = float(cabeceras["X-Ratelimit-Reset"])
+                if "X-Ratelimit-Used" in cabeceras:
+                    self.usadas = int(float(cabeceras["X-Ratelimit-Used"]))
+            except ValueError:
+                return
+            self._actualizado = time.monotonic()
+
+    def pausa(self):
+        """Segundos que conviene esperar antes de la siguiente petición"""
+        with self._lock:
+            if self.restantes is None or self.reinicio is None:
+                return 0.0
+            segundos = max(0.0, self.reinicio - (time.monotonic() - self._actualizado))
+            disponibles = self.restantes - self.margen
+            if disponibles <= 0:
+                return segundos
+            return segundos / disponibles
+
+    def esperar(self):
+        pausa = self.pausa()
+        if pausa > 0:
+            time.sleep(pausa)
+
+
+class ClienteListadosJSON:
+    """Lee listados de Reddit como JSON con peticiones condicionales
+
+    Guarda el ETag y Last-Modified de cada página (subreddit, orden, periodo,
+    cursor ``after`` y tamaño) y los reenvía en If-None-Match /
+    If-Modified-Since: si la página no cambió Reddit responde 304 sin
+    contenido. Los validadores de una página solo se conservan cuando el
+    consumidor confirma con ``confirmar`` que la leyó entera, porque un 304
+    significa "nada nuevo" y no debe ocultar posts que se quedaron sin leer.
+    Se guardan en un JSON para aprovecharlos en la siguiente ejecución.
+    Reutiliza una sola sesión HTTP y respeta las cabeceras de límite de
+    peticiones.
+
+    Args:
+        user_agent: User-Agent obligatorio para la API de Reddit
+        obtener_token: Función opcional que devuelve un token OAuth; si se
+            indica se usa oauth.reddit.com (límite de peticiones mayor)
+        ruta_validadores: Archivo JSON donde se guardan ETag y Last-Modified
+            (si es None solo se conservan en memoria)
+        max_reintentos: Reintentos tras un 429 antes de dar el error
+    """
+
+    def __init__(
+        self, user_agent, obtener_token=None, timeout=30, ruta_validadores=None, max_reintentos=3
+    ):
+        self.obtener_token = obtener_token
+        self.timeout = timeout
+        self.ruta_validadores = ruta_validadores
+        self.max_reintentos = max_reintentos
+        self.sesion = requests.Session()
+        self.sesion.headers["User-Agent"] = user_agent or "RedditPython/1.0"
+        self.limite = ControlLimiteReddit()
+        self._lock = threading.Lock()
+        self._validadores = {}
+        self._sin_confirmar = {}
+        if ruta_validadores and os.path.exists(ruta_validadores):
+            try:
+                with open(ruta_validadores, "r", encoding="utf-8") as f:
+                    self._validadores = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ No se pudieron leer los validadores de Reddit: {e}")
+
+    def _guardar_validadores(self):
+        if not self.ruta_validadores:
+            return
+        with self._lock:
+            datos = dict(self._validadores)
+        try:
+            carpeta = os.path.dirname(self.ruta_validadores)
+            if carpeta:
+                os.makedirs(carpeta, exist_ok=True)
+            temporal = f"{self.ruta_validadores}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(datos, f, indent=2)
+            os.replace(temporal, self.ruta_validadores)
+        except OSError as e:
+            print(f"⚠️ No se pudieron guardar los validadores de Reddit: {e}")
+
+    @staticmethod
+    def _clave(subreddit, listado, periodo, after, limit):
+        partes = (subreddit, listado, periodo, after or "-", min(100, limit))
+        return ":".join(str(p) for p in partes if p)
+
+    def confirmar(self, subreddit, listado, periodo=None, after=None, limit=100):
+        """Conserva los validadores de una página que ya se leyó entera"""
+        clave = self._clave(subreddit, listado, periodo, after, limit)
+        with self._lock:
+            validadores = self._sin_confirmar.pop(clave, None)
+            if validadores is None:
+                return
+            self._validadores[clave] = validadores
+        self._guardar_validadores()
+
+    def _url_base(self):
+        return "https://oauth.reddit.com" if self.obtener_token else "https://www.reddit.com"
+
+    def listado(self, subreddit, listado, periodo=None, after=None, limit=100):
+        """Descarga una página del listado
+
+        Returns:
+            Tupla (posts ligeros, cursor "after" de la página siguiente o
+            None si no hay más), o None si el listado no cambió (304)
+        """
+        url = f"{self._url_base()}/r/{subreddit}/{listado}.json"
+        params = {"limit": min(100, limit), "raw_json": 1}
+        if after:
+            params["after"] = after
+        if periodo:
+            params["t"] = periodo
+
+        clave = self._clave(subreddit, listado, periodo, after, limit)
+        with self._lock:
+            etag, modificado = self._validadores.get(clave, (None, None))
+        cabeceras = {}
+        if etag:
+            cabeceras["If-None-Match"] = etag
+        if modificado:
+            cabeceras["If-Modified-Since"] = modificado
+
+        for intento in range(self.max_reintentos + 1):
+            if self.obtener_token:
+                cabeceras["Authorization"] = f"bearer {self.obtener_token()}"
+            self.limite.esperar()
+            respuesta = self.sesion.get(url, params=params, headers=cabeceras, timeout=self.timeout)
+            self.limite.actualizar(respuesta.headers)
+            if respuesta.status_code != 429 or intento == self.max_reintentos:
+                break
+            espera = float(respuesta.headers.get("Retry-After", self.limite.pausa() or 60))
+            print(
+                f"⏳ Límite de Reddit alcanzado, esperando {espera:.0f}s "
+                f"(reintento {intento + 1}/{self.max_reintentos})..."
+            )
+            time.sleep(espera)
+
+        if respuesta.status_code == 304:
+            return None
+        respuesta.raise_for_status()
+
+        # Se guardan al confirmar que la página se leyó entera
+        validadores = [respuesta.headers.get("ETag"), respuesta.headers.get("Last-Modified")]
+        if any(validadores):
+            with self._lock:
+                self._sin_confirmar[clave] = validadores
+        datos = respuesta.json().get("data", {})
+        hijos = datos.get("children", [])
+        posts = [post_desde_json(hijo) for hijo in hijos if hijo.get("kind") == "t3"]
+        return posts, datos.get("after")
@@ -0,0 +1,226 @@
+import json
+import os
+import threading
+from types import SimpleNamespace
+
+from cliente_reddit import refrescar_en_lote
+
+LISTADOS_VALIDOS = ("hot", "new", "top", "rising", "controversial")
+PERIODOS_VALIDOS = ("hour", "day", "week", "month", "year", "all")
+
+
+def parsear_fuentes(definicion):
+    """Convierte "nosleep:hot,nosleep:top:week" en [(subreddit, listado, periodo)]
+
+    El listado por defecto es "hot" y el periodo solo se usa en top y
+    controversial (por defecto "week").
+    """
+    fuentes = []
+    for parte in (definicion or "").split(","):
+        parte = parte.strip()
+        if not parte:
+            continue
+        subreddit, _, resto = parte.partition(":")
+        listado, _, periodo = resto.partition(":")
+        listado = listado or "hot"
+        if listado not in LISTADOS_VALIDOS:
+            raise ValueError(f"Listado de Reddit no válido: {listado}")
+        if listado in ("top", "controversial"):
+            periodo = periodo or "week"
+            if periodo not in PERIODOS_VALIDOS:
+                raise ValueError(f"Periodo de Reddit no válido: {periodo}")
+        else:
+            periodo = None
+        fuentes.append((subreddit.strip(), listado, periodo))
+    return fuentes
+
+
+def _nombre_fuente(fuente):
+    subreddit, listado, periodo = fuente
+    return ":".join(p for p in (subreddit, listado, periodo) if p)
+
+
+class CosechadorReddit:
+    """Recorre varios subreddits y listados paginando con el cursor ``after``
+
+    El cursor de cada listado (el ``after`` que devuelve Reddit) se guarda en
+    un JSON cuando el consumidor ha recibido todos los posts de la página, de
+    modo que la siguiente ejecución continúa donde terminó la anterior en
+    lugar de volver a descargar la primera página. Cuando un listado se agota
+    (Reddit no devuelve ``after``) su cursor vuelve a empezar desde el
+    principio, y si un cursor guardado ya no es válido (página vacía, algo
+    habitual en hot y rising) se vuelve a leer desde arriba.
+
+    Los posts que el consumidor recibió pero no llegó a usar se le devuelven
+    con ``devolver`` y son los primeros de la siguiente llamada a
+    ``candidatos`` (también en la siguiente ejecución: se guardan sus
+    fullnames junto a los cursores y se revalidan en lote).
+
+    Args:
+        reddit: Instancia de praw.Reddit
+        fuentes: Lista de (subreddit, listado, periodo) o cadena para
+            parsear_fuentes
+        ruta_cursores: Archivo JSON donde se guardan los cursores
+        tamano_pagina: Posts por petición (máximo 100 en la API de Reddit)
+        max_paginas: Páginas por listado y ejecución
+        cliente_json: ClienteListadosJSON opcional; si se indica los listados
+            se leen como JSON con peticiones condicionales en lugar de PRAW
+    """
+
+    def __init__(
+        self, reddit, fuentes, ruta_cursores, tamano_pagina=25, max_paginas=4, cliente_json=None
+    ):
+        self.reddit = reddit
+        self.cliente_json = cliente_json
+        self.fuentes = parsear_fuentes(fuentes) if isinstance(fuentes, str) else list(fuentes)
+        self.ruta_cursores = ruta_cursores
+        self.tamano_pagina = min(100, tamano_pagina)
+        self.max_paginas = max_paginas
+        self._lock = threading.Lock()
+        self._cursores = {}
+        if os.path.exists(ruta_cursores):
+            try:
+                with open(ruta_cursores, "r", encoding="utf-8") as f:
+                    self._cursores = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ No se pudieron leer los cursores de Reddit: {e}")
+        # Los nombres de fuente siempre llevan listado ("sub:hot"): sin colisión
+        self._pendientes_guardados = list(self._cursores.pop("pendientes", None) or [])
+        self._pendientes = []
+
+    def cursor(self, fuente):
+        """Devuelve el cursor guardado para la fuente o None"""
+        return self._cursores.get(_nombre_fuente(fuente))
+
+    def _guardar_cursor(self, fuente, leido, cursor):
+        """Avanza el cursor tras leer entera la página que empezaba en ``leido``"""
+        with self._lock:
+            self._cursores[_nombre_fuente(fuente)] = cursor
+        self._guardar()
+        if self.cliente_json is not None:
+            subreddit, listado, periodo = fuente
+            self.cliente_json.confirmar(
+                subreddit, listado, periodo, after=leido, limit=self.tamano_pagina
+            )
+
+    def _guardar(self):
+        with self._lock:
+            datos = dict(self._cursores)
+            pendientes = [post.fullname for post in self._pendientes] + self._pendientes_guardados
+            if pendientes:
+                datos["pendientes"] = list(dict.fromkeys(pendientes))
+        try:
+            carpeta = os.path.dirname(self.ruta_cursores)
+            if carpeta:
+                os.makedirs(carpeta, exist_ok=True)
+            temporal = f"{self.ruta_cursores}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(datos, f, indent=2)
+            os.replace(temporal, self.ruta_cursores)
+        except OSError as e:
+            print(f"⚠️ No se pudieron guardar los cursores de Reddit: {e}")
+
+    def _pagina(self, fuente, cursor):
+        """Descarga una página del listado a partir del cursor
+
+        Returns:
+            Tupla (posts, cursor de la página siguiente o None si el listado
+            se agotó), o None si el listado no cambió desde la última lectura
+            (respuesta 304 del cliente JSON)
+        """
+        subreddit, listado, periodo = fuente
+        if self.cliente_json is not None:
+            return self.cliente_json.listado(
+                subreddit, listado, periodo, after=cursor, limit=self.tamano_pagina
+            )
+        generador = getattr(self.reddit.subreddit(subreddit), listado)
+        argumentos = {"limit": self.tamano_pagina, "params": {"after": cursor} if cursor else {}}
+        if periodo:
+            argumentos["time_filter"] = periodo
+        paginador = generador(**argumentos)
+        posts = list(paginador)
+        # PRAW guarda en params el "after" de la respuesta; si no cambió, el
+        # listado no tiene más páginas
+        siguiente = getattr(paginador, "params", {}).get("after")
+        return posts, (siguiente if siguiente != cursor else None)
+
+    def devolver(self, posts):
+        """Devuelve posts entregados que no se llegaron a usar"""
+        posts = list(posts)
+        if not posts:
+            return
+        with self._lock:
+            conocidos = {post.fullname for post in self._pendientes}
+            self._pendientes.extend(post for post in posts if post.fullname not in conocidos)
+        self._guardar()
+
+    def _tomar_pendientes(self):
+        """Saca los posts devueltos, revalidando los de ejecuciones anteriores"""
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, []
+            guardados, self._pendientes_guardados = self._pendientes_guardados, []
+        en_memoria = {post.fullname for post in pendientes}
+        guardados = [fullname for fullname in guardados if fullname not in en_memoria]
+        if guardados:
+            print(f"📋 Recuperando {len(guardados)} candidatos de la ejecución anterior...")
+            pendientes += refrescar_en_lote(
+                self.reddit, [SimpleNamespace(fullname=fullname) for fullname in guardados]
+            )
+        return pendientes
+
+    def candidatos(self):
+        """Genera los posts de todas las fuentes, una página de cada una por turno
+
+        El cursor avanza (y se guarda, una vez por página) cuando el
+        consumidor ha pedido todos los posts de la página, así que una página
+        a medias se vuelve a descargar en la siguiente ejecución en lugar de
+        perder sus últimos posts. Antes que las páginas se entregan los posts
+        devueltos.
+        """
+        entregados = set()
+        pendientes = self._tomar_pendientes()
+        for i, post in enumerate(pendientes):
+            entregados.add(post.fullname)
+            try:
+                yield post
+            except GeneratorExit:
+                # Los que no se llegaron a pedir siguen pendientes
+                self.devolver(pendientes[i + 1 :])
+                raise
+
+        activas = list(self.fuentes)
+        paginas = {_nombre_fuente(fuente): 0 for fuente in activas}
+        while activas:
+            for fuente in list(activas):
+                nombre = _nombre_fuente(fuente)
+                cursor = self.cursor(fuente)
+                try:
+                    pagina = self._pagina(fuente, cursor)
+                    if pagina is not None and not pagina[0] and cursor and paginas[nombre] == 0:
+                        # El cursor guardado caducó (el listado cambió): desde arriba
+                        print(f"🔁 r/{nombre}: el cursor guardado ya no es válido, leyendo desde el principio")
+                        cursor = None
+                        pagina = self._pagina(fuente, cursor)
+                except Exception as e:
+                    print(f"⚠️ Error leyendo r/{nombre}: {e}")
+                    activas.remove(fuente)
+                    continue
+
+                if pagina is None:
+                    # Sin cambios desde la última lectura: se conserva el cursor
+                    print(f"💤 r/{nombre}: sin posts nuevos")
+                    activas.remove(fuente)
+                    continue
+
+                posts, siguiente = pagina
+                paginas[nombre] += 1
+                print(f"📥 r/{nombre}: página {paginas[nombre]} con {len(posts)} posts")
+                for post in posts:
+                    if post.fullname not in entregados:
+                        yield post
+
+                # Sin "after" el listado está agotado: la próxima ejecución
+                # empieza desde arriba. Las páginas cortas no lo agotan.
+                self._guardar_cursor(fuente, cursor, siguiente if posts else None)
+                if not posts or siguiente is None or paginas[nombre] >= self.max_paginas:
+                    activas.remove(fuente)
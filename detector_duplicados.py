@@ -0,0 +1,169 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+BITS_FIRMA = 64
+_PATRON_PALABRA = re.compile(r"\w+")
+
+
+def calcular_simhash(texto, tamano_shingle=3):
+    """Calcula la firma SimHash de 64 bits de un texto
+
+    El texto se normaliza a palabras en minúsculas y se divide en shingles de
+    ``tamano_shingle`` palabras consecutivas. Textos casi iguales (reposts con
+    pequeños cambios) producen firmas con muy pocos bits distintos.
+    """
+    palabras = _PATRON_PALABRA.findall((texto or "").lower())
+    if len(palabras) < tamano_shingle:
+        shingles = {" ".join(palabras)} if palabras else set()
+    else:
+        shingles = {
+            " ".join(palabras[i : i + tamano_shingle])
+            for i in range(len(palabras) - tamano_shingle + 1)
+        }
+    if not shingles:
+        return 0
+
+    pesos = [0] * BITS_FIRMA
+    for shingle in shingles:
+        valor = int.from_bytes(
+            hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big"
+        )
+        for bit in range(BITS_FIRMA):
+            pesos[bit] += 1 if valor >> bit & 1 else -1
+
+    firma = 0
+    for bit, peso in enumerate(pesos):
+        if peso > 0:
+            firma |= 1 << bit
+    return firma
+
+
+def distancia_hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class DetectorDuplicados:
+    """Índice de firmas SimHash de las historias procesadas
+
+    Las firmas se guardan en SQLite y se indexan en memoria por bandas: con
+    ``distancia_max`` + 1 bandas, dos firmas a distancia de Hamming menor o
+    igual que ``distancia_max`` coinciden por fuerza en al menos una banda, así
+    que cada búsqueda solo compara con unos pocos candidatos y tarda
+    microsegundos aunque haya miles de historias.
+
+    Args:
+        ruta_db: Base de datos SQLite de las firmas
+        distancia_max: Bits distintos como máximo para considerar dos
+            historias casi duplicadas (3 de 64 ≈ 95% de similitud)
+    """
+
+    def __init__(self, ruta_db, distancia_max=3):
+        carpeta = os.path.dirname(ruta_db)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self.distancia_max = distancia_max
+        self.num_bandas = distancia_max + 1
+        self._ancho_banda = BITS_FIRMA // self.num_bandas
+        self._lock = threading.Lock()
+        self._firmas = {}
+        self._bandas = [{} for _ in range(self.num_bandas)]
+        self._conexion = sqlite3.connect(ruta_db, timeout=30, check_same_thread=False)
+        with self._lock, self._conexion:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute(
+                """
+                CREATE TABLE IF NOT EXISTS firmas (
+                    post_id TEXT PRIMARY KEY,
+                    simhash TEXT NOT NULL,
+                    fecha REAL NOT NULL
+                )
+                """
+            )
+            for post_id, simhash in self._conexion.execute("SELECT post_id, simhash FROM firmas"):
+                self._indexar(post_id, int(simhash, 16))
+
+    def _valores_banda(self, firma):
+        mascara = (1 << self._ancho_banda) - 1
+        return [(firma >> (i * self._ancho_banda)) & mascara for i in range(self.num_bandas)]
+
+    def _indexar(self, post_id, firma):
+        self._firmas[post_id] = firma
+        for banda, valor in zip(self._bandas, self._valores_banda(firma)):
+            banda.setdefault(valor, set()).add(post_id)
+
+    def __len__(self):
+        return len(self._firmas)
+
+    def _buscar_firma(self, firma):
+        # Debe llamarse con el lock tomado
+        candidatos = set()
+        for banda, valor in zip(self._bandas, self._valores_banda(firma)):
+            candidatos.update(banda.get(valor, ()))
+        mejor = None
+        mejor_distancia = self.distancia_max + 1
+        for post_id in candidatos:
+            distancia = distancia_hamming(firma, self._firmas[post_id])
+            if distancia < mejor_distancia:
+                mejor, mejor_distancia = post_id, distancia
+        return mejor
+
+    def _guardar_firma(self, post_id, firma):
+        # Debe llamarse con el lock tomado
+        with self._conexion:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO firmas (post_id, simhash, fecha) VALUES (?, ?, ?)",
+                (post_id, f"{firma:016x}", time.time()),
+            )
+        self._indexar(post_id, firma)
+
+    def buscar_firma(self, firma):
+        """Devuelve el post_id más parecido dentro del umbral o None"""
+        with self._lock:
+            return self._buscar_firma(firma)
+
+    def buscar(self, texto):
+        """Devuelve el post_id de una historia casi igual ya registrada o None"""
+        return self.buscar_firma(calcular_simhash(texto))
+
+    def registrar(self, post_id, texto):
+        """Añade la firma del texto al índice y a la base de datos"""
+        firma = calcular_simhash(texto)
+        with self._lock:
+            self._guardar_firma(post_id, firma)
+        return firma
+
+    def buscar_o_registrar(self, texto, post_id):
+        """Busca una historia casi igual y, si no la hay, registra esta
+
+        La firma se calcula una sola vez y la búsqueda y el registro se hacen
+        bajo el mismo lock, así que dos hilos con el mismo repost no pueden
+        darlo ambos por nuevo.
+
+        Returns:
+            post_id de la historia casi igual ya registrada, o None si el
+            texto es nuevo (y ha quedado registrado con ``post_id``)
+        """
+        firma = calcular_simhash(texto)
+        with self._lock:
+            original = self._buscar_firma(firma)
+            if original is None:
+                self._guardar_firma(post_id, firma)
+        return original
+
+    def eliminar(self, post_id):
+        """Quita la firma de un post (p. ej. si no se pudo procesar)"""
+        with self._lock, self._conexion:
+            self._conexion.execute("DELETE FROM firmas WHERE post_id = ?", (post_id,))
+            firma = self._firmas.pop(post_id, None)
+            if firma is None:
+                return
+            for banda, valor in zip(self._bandas, self._valores_banda(firma)):
+                banda.get(valor, set()).discard(post_id)
+
+    def cerrar(self):
+        with self._lock:
+            self._conexion.close()
@@ -0,0 +1,109 @@
+import re
+
+# Palabras funcionales más frecuentes de cada idioma. Son pocas pero cubren
+# un porcentaje muy alto de cualquier texto corrido, lo que basta para
+# distinguir idiomas sin modelos ni conexión a internet.
+PALABRAS_FUNCIONALES = {
+    "es": {
+        "de", "la", "que", "el", "en", "y", "los", "se", "del", "las", "un", "por",
+        "con", "no", "una", "su", "para", "es", "al", "lo", "como", "más", "pero",
+        "sus", "le", "ya", "o", "fue", "este", "ha", "sí", "porque", "esta", "son",
+        "entre", "cuando", "muy", "sin", "sobre", "también", "me", "hasta", "hay",
+        "donde", "desde", "todo", "nos", "durante", "uno", "ni", "contra", "ese",
+        "eso", "mí", "qué", "yo", "él", "ella", "estaba", "había", "mi",
+    },
+    "en": {
+        "the", "of", "and", "to", "a", "in", "is", "that", "it", "was", "for", "on",
+        "are", "with", "as", "i", "his", "they", "be", "at", "one", "have", "this",
+        "from", "or", "had", "by", "not", "but", "what", "all", "were", "we", "when",
+        "your", "can", "said", "there", "an", "which", "she", "do", "their", "if",
+        "will", "up", "about", "out", "them", "then", "my", "me", "he", "you",
+        "would", "could", "just", "like", "been", "into", "didn't", "don't",
+    },
+    "pt": {
+        "de", "a", "o", "que", "e", "do", "da", "em", "um", "para", "é", "com",
+        "não", "uma", "os", "no", "se", "na", "por", "mais", "as", "dos", "como",
+        "mas", "foi", "ao", "ele", "das", "tem", "à", "seu", "sua", "ou", "ser",
+        "quando", "muito", "há", "nos", "já", "está", "eu", "também", "só", "pelo",
+        "você", "isso", "ela", "minha", "meu", "então", "estava", "tinha",
+    },
+    "fr": {
+        "de", "la", "le", "et", "les", "des", "en", "un", "du", "une", "que", "est",
+        "pour", "qui", "dans", "a", "par", "plus", "pas", "au", "sur", "ne", "se",
+        "ce", "il", "sont", "avec", "ils", "je", "elle", "mais", "nous", "vous",
+        "ou", "son", "sa", "était", "avait", "cette", "aux", "tout", "été", "très",
+    },
+    "de": {
+        "der", "die", "und", "in", "den", "von", "zu", "das", "mit", "sich", "des",
+        "auf", "für", "ist", "im", "dem", "nicht", "ein", "eine", "als", "auch",
+        "es", "an", "werden", "aus", "er", "hat", "dass", "sie", "nach", "wird",
+        "bei", "einer", "um", "am", "sind", "noch", "wie", "einem", "über", "ich",
+        "war", "aber", "mir", "mich", "wir",
+    },
+    "it": {
+        "di", "e", "il", "la", "che", "in", "a", "per", "un", "è", "del", "non",
+        "una", "con", "si", "da", "le", "i", "della", "sono", "al", "ma", "come",
+        "lo", "anche", "gli", "nel", "più", "era", "ho", "mi", "io", "questo",
+        "quando", "ero", "perché", "molto", "sua", "suo", "dove",
+    },
+}
+
+# Rasgos ortográficos casi exclusivos de un idioma
+RASGOS_ORTOGRAFICOS = {
+    "es": re.compile(r"[ñ¿¡]"),
+    "pt": re.compile(r"[ãõ]|ção"),
+    "fr": re.compile(r"[èêëçœ]|\b[ldjnt]'"),
+    "de": re.compile(r"[äöüß]"),
+}
+
+# Índice inverso palabra -> idiomas para puntuar cada palabra con una sola consulta
+IDIOMAS_POR_PALABRA = {}
+for _idioma, _palabras in PALABRAS_FUNCIONALES.items():
+    for _palabra in _palabras:
+        IDIOMAS_POR_PALABRA.setdefault(_palabra, []).append(_idioma)
+
+PATRON_PALABRA = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+
+
+def detectar_idioma_local(texto, max_palabras=200):
+    """Detecta el idioma de un texto sin usar la red
+
+    Cuenta cuántas palabras del texto pertenecen a la lista de palabras
+    funcionales de cada idioma y suma un pequeño bonus por rasgos ortográficos
+    característicos (ñ, ¿, ç, ß...). Solo se analizan las primeras
+    ``max_palabras`` palabras, por lo que el coste es constante.
+
+    Args:
+        texto: Texto a analizar
+        max_palabras: Número máximo de palabras a considerar
+
+    Returns:
+        Tupla (codigo_idioma, confianza) con la confianza entre 0 y 1.
+        Si no hay evidencia suficiente devuelve ("en", 0.0).
+    """
+    if not texto or texto.isspace():
+        return "en", 0.0
+
+    # Unas 8 letras por palabra bastan para cubrir max_palabras
+    fragmento = texto[: max_palabras * 8].lower()
+    palabras = PATRON_PALABRA.findall(fragmento)[:max_palabras]
+    if not palabras:
+        return "en", 0.0
+
+    puntuaciones = {idioma: 0.0 for idioma in PALABRAS_FUNCIONALES}
+    for palabra in palabras:
+        for idioma in IDIOMAS_POR_PALABRA.get(palabra, ()):
+            puntuaciones[idioma] += 1
+
+    for idioma, patron in RASGOS_ORTOGRAFICOS.items():
+        puntuaciones[idioma] += 0.5 * len(patron.findall(fragmento))
+
+    ordenados = sorted(puntuaciones.items(), key=lambda item: item[1], reverse=True)
+    (mejor, puntos), (_, segundo) = ordenados[0], ordenados[1]
+    if puntos == 0:
+        return "en", 0.0
+
+    # Confianza: ventaja sobre el segundo idioma, atenuada en textos muy cortos
+    margen = (puntos - segundo) / puntos
+    cobertura = min(1.0, len(palabras) / 20)
+    return mejor, round(margen * cobertura, 3)
@@ -0,0 +1,428 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import threading
+import time
+
+# Modos de la grabadora
+MODO_GRABAR = "grabar"
+MODO_REPRODUCIR = "reproducir"
+
+_casete = None
+_originales = {}
+
+# Estado que el pipeline conserva entre ejecuciones (variable de entorno de la
+# ruta y ruta por defecto). Decide qué posts se leen y qué peticiones se
+# hacen: cursores de Reddit, posts ya procesados, cachés del LLM y del audio...
+ESTADO_PERSISTENTE = {
+    "REDDIT_CURSORES_JSON": "historias/cursores_reddit.json",
+    "REDDIT_VALIDADORES_JSON": "historias/validadores_reddit.json",
+    "REGISTRO_HISTORIAS_DB": "historias/registro_posts.db",
+    "DUPLICADOS_DB": "historias/firmas_historias.db",
+    "CACHE_LLM_DB": "historias/cache_llm.db",
+    "MEMORIA_TRADUCCION_DB": "historias/memoria_traduccion.db",
+    "LATENCIAS_LLM_JSON": "historias/latencias_llm.json",
+    "CACHE_AUDIO_DIR": "historias/cache_audio",
+    "MODELO_DURACION_JSON": "historias/modelo_duracion_voz.json",
+}
+
+
+class CaseteHTTP:
+    """Respuestas grabadas de los servicios externos para reproducirlas sin red
+
+    Cada interacción se identifica por una clave (hash del método, la URL y
+    el cuerpo de la petición, o de los parámetros de la síntesis de Edge TTS).
+    El índice ``indice.jsonl`` guarda el estado, las cabeceras y la latencia
+    observada, y los cuerpos (texto o binario: videos, imágenes, audio) se
+    guardan aparte en ``cuerpos/`` con su sha256 como nombre. Las peticiones
+    repetidas se reproducen en el orden en que se grabaron. Los tokens OAuth
+    y las cookies de las respuestas se graban como REDACTADO.
+
+    Args:
+        ruta: Carpeta del casete
+        modo: MODO_GRABAR o MODO_REPRODUCIR
+        factor_latencia: Multiplica la latencia grabada al reproducir
+            (0 = sin esperas, 1 = como en la grabación)
+        latencia_fija: Si se indica, segundos de espera de cada respuesta en
+            lugar de la latencia grabada
+    """
+
+    def __init__(self, ruta, modo, factor_latencia=1.0, latencia_fija=None):
+        if modo not in (MODO_GRABAR, MODO_REPRODUCIR):
+            raise ValueError(f"Modo de grabación desconocido: {modo}")
+        self.ruta = ruta
+        self.modo = modo
+        self.factor_latencia = factor_latencia
+        self.latencia_fija = latencia_fija
+        self._lock = threading.Lock()
+        self._entradas = {}
+        self._usos = {}
+        os.makedirs(os.path.join(ruta, "cuerpos"), exist_ok=True)
+        indice = os.path.join(ruta, "indice.jsonl")
+        if os.path.exists(indice):
+            with open(indice, "r", encoding="utf-8") as f:
+                for linea in f:
+                    if linea.strip():
+                        entrada = json.loads(linea)
+                        self._entradas.setdefault(entrada["clave"], []).append(entrada)
+
+    @staticmethod
+    def clave(*partes):
+        resumen = hashlib.sha256()
+        for parte in partes:
+            if isinstance(parte, str):
+                parte = parte.encode("utf-8")
+            resumen.update(parte or b"")
+            resumen.update(b"\0")
+        return resumen.hexdigest()
+
+    def _guardar_cuerpo(self, datos):
+        nombre = hashlib.sha256(datos).hexdigest()
+        ruta = os.path.join(self.ruta, "cuerpos", nombre)
+        if not os.path.exists(ruta):
+            with open(ruta, "wb") as f:
+                f.write(datos)
+        return nombre
+
+    def leer_cuerpo(self, nombre):
+        with open(os.path.join(self.ruta, "cuerpos", nombre), "rb") as f:
+            return f.read()
+
+    def guardar(self, clave, descripcion, latencia, cuerpo=b"", **datos):
+        """Añade una interacción al casete"""
+        entrada = dict(
+            datos,
+            clave=clave,
+            descripcion=descripcion,
+            latencia=round(latencia, 4),
+            cuerpo=self._guardar_cuerpo(cuerpo),
+        )
+        with self._lock:
+            self._entradas.setdefault(clave, []).append(entrada)
+            with open(os.path.join(self.ruta, "indice.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+
+    def siguiente(self, clave, descripcion):
+        """Devuelve la siguiente interacción grabada para la clave
+
+        Si la petición se repite más veces que en la grabación se reutiliza
+        la última respuesta.
+        """
+        with self._lock:
+            entradas = self._entradas.get(clave)
+            if not entradas:
+                raise ConnectionError(f"Sin respuesta grabada en {self.ruta} para {descripcion}")
+            uso = self._usos.get(clave, 0)
+            self._usos[clave] = uso + 1
+        return entradas[min(uso, len(entradas) - 1)]
+
+    def espera(self, latencia):
+        """Segundos de latencia sintética para una respuesta"""
+        if self.latencia_fija is not None:
+            return self.latencia_fija
+        return latencia * self.factor_latencia
+
+
+# Secretos que no deben quedar en el casete: los tokens OAuth de las
+# respuestas (p. ej. /api/v1/access_token de Reddit) y las cookies de sesión
+_PATRON_TOKEN = re.compile(rb'("(?:access_token|refresh_token|id_token)"\s*:\s*)"[^"]*"')
+_CABECERAS_SECRETAS = ("set-cookie",)
+REDACTADO = "REDACTADO"
+
+
+def _redactar(cuerpo, cabeceras):
+    """Devuelve el cuerpo y las cabeceras sin tokens ni cookies para grabarlos"""
+    if b"_token" in cuerpo:
+        cuerpo = _PATRON_TOKEN.sub(rb'\1"' + REDACTADO.encode() + rb'"', cuerpo)
+    cabeceras = {
+        nombre: REDACTADO if nombre.lower() in _CABECERAS_SECRETAS else valor
+        for nombre, valor in cabeceras.items()
+    }
+    return cuerpo, cabeceras
+
+
+def _describir(metodo, url):
+    return f"{metodo} {url.split('?', 1)[0]}"
+
+
+def _cuerpo_peticion(cuerpo):
+    if cuerpo is None:
+        return b""
+    if isinstance(cuerpo, str):
+        return cuerpo.encode("utf-8")
+    if isinstance(cuerpo, (bytes, bytearray)):
+        return bytes(cuerpo)
+    return b""  # Cuerpos en streaming (archivos): no forman parte de la clave
+
+
+def _parchear_requests(casete):
+    import requests
+    from requests.structures import CaseInsensitiveDict
+    from requests.utils import get_encoding_from_headers
+    from datetime import timedelta
+
+    original = requests.Session.send
+    _originales[(requests.Session, "send")] = original
+
+    def send(self, peticion, **kwargs):
+        clave = casete.clave("http", peticion.method, peticion.url, _cuerpo_peticion(peticion.body))
+        descripcion = _describir(peticion.method, peticion.url)
+
+        if casete.modo == MODO_GRABAR:
+            inicio = time.monotonic()
+            respuesta = original(self, peticion, **kwargs)
+            # Lee también las respuestas en streaming
+            cuerpo, cabeceras = _redactar(respuesta.content, dict(respuesta.headers))
+            casete.guardar(
+                clave,
+                descripcion,
+                time.monotonic() - inicio,
+                cuerpo,
+                estado=respuesta.status_code,
+                motivo=respuesta.reason,
+                cabeceras=cabeceras,
+            )
+            return respuesta
+
+        entrada = casete.siguiente(clave, descripcion)
+        latencia = casete.espera(entrada["latencia"])
+        if latencia > 0:
+            time.sleep(latencia)
+        respuesta = requests.Response()
+        respuesta.status_code = entrada["estado"]
+        respuesta.reason = entrada.get("motivo")
+        respuesta.headers = CaseInsensitiveDict(entrada.get("cabeceras") or {})
+        respuesta.encoding = get_encoding_from_headers(respuesta.headers)
+        respuesta._content = casete.leer_cuerpo(entrada["cuerpo"])
+        respuesta._content_consumed = True
+        respuesta.url = peticion.url
+        respuesta.request = peticion
+        respuesta.elapsed = timedelta(seconds=latencia)
+        return respuesta
+
+    requests.Session.send = send
+
+
+def _parchear_httpx(casete):
+    try:
+        import httpx
+    except ImportError:
+        return  # Solo lo usa el SDK de OpenAI (imágenes con DALL-E)
+
+    original = httpx.Client.send
+    _originales[(httpx.Client, "send")] = original
+
+    def send(self, peticion, **kwargs):
+        url = str(peticion.url)
+        clave = casete.clave("http", peticion.method, url, peticion.read())
+        descripcion = _describir(peticion.method, url)
+
+        if casete.modo == MODO_GRABAR:
+            inicio = time.monotonic()
+            respuesta = original(self, peticion, **kwargs)
+            cuerpo, cabeceras = _redactar(respuesta.read(), dict(respuesta.headers))
+            casete.guardar(
+                clave,
+                descripcion,
+                time.monotonic() - inicio,
+                cuerpo,
+                estado=respuesta.status_code,
+                cabeceras=cabeceras,
+            )
+            return respuesta
+
+        entrada = casete.siguiente(clave, descripcion)
+        latencia = casete.espera(entrada["latencia"])
+        if latencia > 0:
+            time.sleep(latencia)
+        # Sin Content-Encoding: el cuerpo se grabó ya descomprimido
+        cabeceras = {
+            nombre: valor
+            for nombre, valor in (entrada.get("cabeceras") or {}).items()
+            if nombre.lower() not in ("content-encoding", "transfer-encoding", "content-length")
+        }
+        return httpx.Response(
+            entrada["estado"],
+            headers=cabeceras,
+            content=casete.leer_cuerpo(entrada["cuerpo"]),
+            request=peticion,
+        )
+
+    httpx.Client.send = send
+
+
+def _parchear_edge_tts(casete):
+    try:
+        from edge_tts import Communicate
+    except ImportError:
+        return
+
+    init_original = Communicate.__init__
+    stream_original = Communicate.stream
+    _originales[(Communicate, "__init__")] = init_original
+    _originales[(Communicate, "stream")] = stream_original
+
+    def __init__(self, texto, *args, **kwargs):
+        init_original(self, texto, *args, **kwargs)
+        # El conector y el proxy no cambian el audio: no forman parte de la clave
+        parametros = sorted(
+            (nombre, valor) for nombre, valor in kwargs.items() if nombre not in ("connector", "proxy")
+        )
+        self._clave_casete = casete.clave("edge-tts", texto, json.dumps([args, parametros], default=str))
+
+    async def stream(self):
+        clave = self._clave_casete
+
+        if casete.modo == MODO_GRABAR:
+            inicio = time.monotonic()
+            mensajes = []
+            audio = bytearray()
+            async for mensaje in stream_original(self):
+                registro = {nombre: valor for nombre, valor in mensaje.items() if nombre != "data"}
+                registro["t"] = round(time.monotonic() - inicio, 4)
+                if mensaje["type"] == "audio":
+                    registro["desde"] = len(audio)
+                    audio.extend(mensaje["data"])
+                    registro["hasta"] = len(audio)
+                mensajes.append(registro)
+                yield mensaje
+            casete.guardar(clave, "edge-tts", time.monotonic() - inicio, bytes(audio), mensajes=mensajes)
+            return
+
+        entrada = casete.siguiente(clave, "edge-tts")
+        audio = casete.leer_cuerpo(entrada["cuerpo"])
+        if casete.latencia_fija is not None:
+            await asyncio.sleep(casete.latencia_fija)
+        anterior = 0.0
+        for registro in entrada["mensajes"]:
+            # Sin latencia fija, los mensajes llegan al ritmo (escalado) de la grabación
+            if casete.latencia_fija is None and registro["t"] > anterior:
+                await asyncio.sleep(casete.espera(registro["t"] - anterior))
+            anterior = registro["t"]
+            mensaje = {
+                nombre: valor
+                for nombre, valor in registro.items()
+                if nombre not in ("t", "desde", "hasta")
+            }
+            if registro["type"] == "audio":
+                mensaje["data"] = audio[registro["desde"] : registro["hasta"]]
+            yield mensaje
+
+    Communicate.__init__ = __init__
+    Communicate.stream = stream
+
+
+# Archivos que se modifican en su sitio (bases SQLite, JSON): se copian. El
+# resto (los audios de la caché, que nunca se reescriben) se enlazan
+_EXTENSIONES_MUTABLES = (".db", ".db-wal", ".db-shm", ".json")
+
+
+def _enlazar_o_copiar(origen, destino):
+    if not origen.endswith(_EXTENSIONES_MUTABLES):
+        try:
+            os.link(origen, destino)
+            return destino
+        except OSError:
+            pass  # Otro sistema de archivos o sin soporte de enlaces duros
+    return shutil.copy2(origen, destino)
+
+
+def _copiar(origen, destino):
+    if os.path.isdir(origen):
+        # La caché de audio puede ocupar gigas: sus archivos se enlazan
+        shutil.copytree(origen, destino, copy_function=_enlazar_o_copiar)
+        return
+    shutil.copy2(origen, destino)
+    # Las bases SQLite en modo WAL pueden tener escrituras aún sin volcar
+    if os.path.exists(f"{origen}-wal"):
+        shutil.copy2(f"{origen}-wal", f"{destino}-wal")
+
+
+def preparar_estado(ruta, modo):
+    """Aísla el estado persistente del pipeline dentro del casete
+
+    Al grabar se copia el estado actual (cursores, registro de posts, firmas,
+    cachés...) en ``estado/`` del casete. En ambos modos se crea una copia de
+    trabajo nueva en ``estado_trabajo/`` a partir de ella y las variables de
+    entorno de ESTADO_PERSISTENTE pasan a apuntar a esa copia, de modo que la
+    grabación y cada reproducción parten exactamente del mismo estado: mismos
+    cursores (y por tanto las mismas URLs de los listados), mismos posts ya
+    procesados y mismos aciertos de caché. El estado real no se modifica.
+    Los audios de la caché, que nunca se reescriben, se enlazan con enlaces
+    duros en lugar de copiarse; las bases de datos y los JSON sí se copian.
+
+    Debe llamarse antes de importar los módulos que leen esas rutas
+    (story_fetcher, audio_generator...).
+    """
+    guardado = os.path.join(ruta, "estado")
+    trabajo = os.path.join(ruta, "estado_trabajo")
+    if modo == MODO_GRABAR:
+        shutil.rmtree(guardado, ignore_errors=True)
+        os.makedirs(guardado)
+        for variable, defecto in ESTADO_PERSISTENTE.items():
+            origen = os.getenv(variable) or defecto
+            if os.path.exists(origen):
+                _copiar(origen, os.path.join(guardado, os.path.basename(defecto)))
+    elif not os.path.isdir(guardado):
+        print(f"⚠️ El casete {ruta} no tiene estado guardado: se reproduce con el estado vacío")
+
+    shutil.rmtree(trabajo, ignore_errors=True)
+    if os.path.isdir(guardado):
+        shutil.copytree(guardado, trabajo, copy_function=_enlazar_o_copiar)
+    else:
+        os.makedirs(trabajo)
+    for variable, defecto in ESTADO_PERSISTENTE.items():
+        os.environ[variable] = os.path.join(trabajo, os.path.basename(defecto))
+
+
+def activar(ruta, modo, factor_latencia=1.0, latencia_fija=None, semilla=0):
+    """Graba o reproduce todas las llamadas a servicios externos
+
+    Intercepta las peticiones de requests (PRAW, Google Translate, DeepSeek,
+    OpenRouter, Pexels, Stability), de httpx (SDK de OpenAI) y la síntesis
+    de Edge TTS por websocket. El estado persistente se aísla en el casete
+    con preparar_estado y se fija la semilla de ``random`` para que la
+    selección aleatoria de videos sea la misma al grabar y al reproducir.
+
+    Returns:
+        El CaseteHTTP activo
+    """
+    global _casete
+    if _casete is not None:
+        desactivar()
+    _casete = CaseteHTTP(ruta, modo, factor_latencia, latencia_fija)
+    preparar_estado(ruta, modo)
+    _parchear_requests(_casete)
+    _parchear_httpx(_casete)
+    _parchear_edge_tts(_casete)
+    random.seed(semilla)
+    print(f"📼 Grabadora HTTP en modo {modo} ({ruta})")
+    return _casete
+
+
+def desactivar():
+    """Restaura las funciones originales"""
+    global _casete
+    for (clase, nombre), original in _originales.items():
+        setattr(clase, nombre, original)
+    _originales.clear()
+    _casete = None
+
+
+def activar_desde_entorno():
+    """Activa la grabadora si GRABADORA_MODO es "grabar" o "reproducir" """
+    modo = os.getenv("GRABADORA_MODO", "").strip().lower()
+    if not modo:
+        return None
+    latencia_fija = os.getenv("GRABADORA_LATENCIA_FIJA", "").strip()
+    return activar(
+        os.getenv("GRABADORA_CASETE", "casetes/pipeline"),
+        modo,
+        factor_latencia=float(os.getenv("GRABADORA_FACTOR_LATENCIA", "1.0")),
+        latencia_fija=float(latencia_fija) if latencia_fija else None,
+        semilla=int(os.getenv("GRABADORA_SEMILLA", "0")),
+    )
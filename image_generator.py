@@ -2,10 +2,10 @@ import requests
 import os
 from PIL import Image
 import json
-import spacy
 from collections import Counter
 from pathlib import Path
 from dotenv import load_dotenv
+from modelos_nlp import obtener_spacy
 
 # Cargar variables de entorno
 load_dotenv()
@@ -159,8 +159,8 @@ def generar_imagenes(historia_id=None, titulo=None):
             if titulo is None:
                 titulo = datos.get("titulo", "Historia sin título")
 
-        # Procesar el texto para extraer palabras clave
-        nlp = spacy.load("es_core_news_sm")
+        # Procesar el texto para extraer palabras clave (solo hace falta el etiquetador)
+        nlp = obtener_spacy("etiquetador")
         doc = nlp(contenido)
         
         # Extraer sustantivos y adjetivos relevantes
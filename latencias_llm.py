@@ -0,0 +1,95 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+
+
+class EstadisticasLatencia:
+    """Latencias recientes de cada proveedor del LLM, persistidas en JSON
+
+    Se guardan las últimas ``max_muestras`` latencias (en segundos) de cada
+    proveedor para calcular percentiles, de modo que el umbral de las
+    peticiones cubiertas se adapte al comportamiento real de cada servicio.
+    El archivo se reescribe como mucho cada ``intervalo_guardado`` segundos
+    (y al salir del programa), no en cada muestra.
+    """
+
+    def __init__(self, ruta_json, max_muestras=200, intervalo_guardado=5.0):
+        self.ruta_json = ruta_json
+        self.max_muestras = max_muestras
+        self.intervalo_guardado = intervalo_guardado
+        self._lock = threading.Lock()
+        self._lock_archivo = threading.Lock()
+        self._ultimo_guardado = 0.0
+        self._pendiente = False
+        self._muestras = {}
+        if os.path.exists(ruta_json):
+            try:
+                with open(ruta_json, "r", encoding="utf-8") as f:
+                    for proveedor, valores in json.load(f).items():
+                        self._muestras[proveedor] = deque(valores, maxlen=max_muestras)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ No se pudieron leer las latencias guardadas: {e}")
+        atexit.register(self.guardar, True)
+
+    def registrar(self, proveedor, segundos):
+        """Añade una latencia observada y guarda el archivo si toca"""
+        with self._lock:
+            muestras = self._muestras.setdefault(proveedor, deque(maxlen=self.max_muestras))
+            muestras.append(round(segundos, 3))
+            self._pendiente = True
+            toca_guardar = time.monotonic() - self._ultimo_guardado >= self.intervalo_guardado
+        if toca_guardar:
+            self.guardar()
+
+    def guardar(self, esperar=False):
+        """Escribe las muestras pendientes en el archivo JSON
+
+        Un solo hilo escribe a la vez; salvo con ``esperar`` los demás no
+        esperan a que termine (sus muestras se guardan en la siguiente vez).
+        """
+        if not self._lock_archivo.acquire(blocking=esperar):
+            return
+        try:
+            with self._lock:
+                if not self._pendiente:
+                    return
+                datos = {nombre: list(valores) for nombre, valores in self._muestras.items()}
+                self._pendiente = False
+                self._ultimo_guardado = time.monotonic()
+            carpeta = os.path.dirname(self.ruta_json) or "."
+            os.makedirs(carpeta, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=carpeta, suffix=".tmp", delete=False
+            ) as f:
+                json.dump(datos, f)
+            os.replace(f.name, self.ruta_json)
+        except OSError as e:
+            print(f"⚠️ No se pudieron guardar las latencias: {e}")
+        finally:
+            self._lock_archivo.release()
+
+    def percentil(self, proveedor, percentil, minimo_muestras=5):
+        """Devuelve el percentil pedido (0-100) o None si hay pocas muestras"""
+        with self._lock:
+            muestras = sorted(self._muestras.get(proveedor, ()))
+        if len(muestras) < minimo_muestras:
+            return None
+        indice = min(len(muestras) - 1, int(round(percentil / 100 * (len(muestras) - 1))))
+        return muestras[indice]
+
+    def resumen(self):
+        """Diccionario proveedor -> (muestras, p50, p95)"""
+        with self._lock:
+            proveedores = list(self._muestras)
+        return {
+            proveedor: (
+                len(self._muestras[proveedor]),
+                self.percentil(proveedor, 50, 1),
+                self.percentil(proveedor, 95, 1),
+            )
+            for proveedor in proveedores
+        }
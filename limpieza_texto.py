@@ -0,0 +1,249 @@
+import time
+
+
+class MotorLimpieza:
+    """Motor de limpieza de texto con un conjunto de reglas configurable
+
+    Reúne en un solo sitio las reglas que antes estaban repetidas en
+    story_fetcher y audio_generator. Trabaja sobre el texto completo:
+
+    1. Las líneas se separan como ``str.splitlines`` (también con ``\x0c``,
+       ``\x1c``, ``\u2028``...) y se vuelven a unir con ``\n``.
+    2. Cada cadena de ``descartar`` y ``lineas_exactas`` se localiza con
+       ``str.find`` sobre todo el texto y las líneas donde aparece se
+       eliminan enteras.
+    3. Los caracteres sueltos y las cadenas a eliminar se quitan con
+       ``str.replace``.
+    4. Opcionalmente se recortan los espacios de cada línea y se quitan las
+       líneas vacías.
+
+    No es más rápido que el bucle por líneas anterior: son varias pasadas en
+    C por el texto y rinden parecido (ver comparar_rendimiento). Una
+    alternancia de ``re`` que lo recorra una sola vez resultó varias veces
+    más lenta en CPython, por eso no se usa.
+
+    Args:
+        descartar: Cadenas que hacen que se descarte la línea completa
+        lineas_exactas: Líneas (sin espacios alrededor) que se descartan
+        eliminar_caracteres: Caracteres que se eliminan en todo el texto
+        eliminar_cadenas: Cadenas que se eliminan en todo el texto
+        descartar_tras_eliminar: Si es True las líneas se descartan según su
+            contenido ya limpio (como hacía limpiar_texto_para_audio)
+        recortar_lineas: Quitar espacios al principio y al final de cada línea
+        quitar_vacias: Eliminar las líneas que quedan vacías
+    """
+
+    def __init__(
+        self,
+        descartar=(),
+        lineas_exactas=(),
+        eliminar_caracteres="",
+        eliminar_cadenas=(),
+        descartar_tras_eliminar=False,
+        recortar_lineas=False,
+        quitar_vacias=False,
+    ):
+        self.descartar = tuple(descartar)
+        self.lineas_exactas = tuple(lineas_exactas)
+        self.descartar_tras_eliminar = descartar_tras_eliminar
+        self.recortar_lineas = recortar_lineas
+        self.quitar_vacias = quitar_vacias
+
+        # Las cadenas se buscan tal como quedan tras quitar los caracteres
+        # sueltos, y las más largas primero para que no las corte una más corta
+        tabla = str.maketrans("", "", eliminar_caracteres)
+        cadenas = {cadena.translate(tabla) for cadena in eliminar_cadenas}
+        cadenas.discard("")
+        self._eliminar_en_orden = tuple(eliminar_caracteres) + tuple(
+            sorted(cadenas, key=len, reverse=True)
+        )
+
+    def _eliminar(self, texto):
+        # replace ya recorre el texto: comprobar antes con "in" lo recorrería dos veces
+        for cadena in self._eliminar_en_orden:
+            texto = texto.replace(cadena, "")
+        return texto
+
+    def _tramos_descartados(self, texto):
+        """Devuelve los tramos (inicio, fin) de las líneas a descartar"""
+        tramos = set()
+        for patron in self.descartar:
+            i = texto.find(patron)
+            while i != -1:
+                inicio = texto.rfind("\n", 0, i) + 1
+                fin = texto.find("\n", i)
+                fin = len(texto) if fin == -1 else fin + 1
+                tramos.add((inicio, fin))
+                i = texto.find(patron, fin)
+        for exacta in self.lineas_exactas:
+            i = texto.find(exacta)
+            while i != -1:
+                inicio = texto.rfind("\n", 0, i) + 1
+                fin = texto.find("\n", i)
+                fin = len(texto) if fin == -1 else fin + 1
+                if texto[inicio:fin].strip() == exacta:
+                    tramos.add((inicio, fin))
+                i = texto.find(exacta, i + 1)
+        return sorted(tramos)
+
+    def _descartar_lineas(self, texto):
+        tramos = self._tramos_descartados(texto)
+        if not tramos:
+            return texto
+        partes = []
+        posicion = 0
+        for inicio, fin in tramos:
+            partes.append(texto[posicion:inicio])
+            posicion = fin
+        partes.append(texto[posicion:])
+        return "".join(partes)
+
+    def limpiar(self, texto):
+        """Aplica todas las reglas al texto completo y lo devuelve limpio"""
+        # Los saltos de línea quedan como en splitlines, pero todos como "\n"
+        if self.descartar_tras_eliminar:
+            texto = self._descartar_lineas("\n".join(self._eliminar(texto).splitlines()))
+        else:
+            texto = self._eliminar(self._descartar_lineas("\n".join(texto.splitlines())))
+        if self.recortar_lineas or self.quitar_vacias:
+            lineas = texto.split("\n")
+            if self.recortar_lineas:
+                lineas = map(str.strip, lineas)
+            if self.quitar_vacias:
+                lineas = filter(None, lineas) if self.recortar_lineas else (
+                    linea for linea in lineas if linea and not linea.isspace()
+                )
+            texto = "\n".join(lineas)
+        return texto
+
+    def limpiar_linea(self, linea):
+        """Limpia una sola línea; devuelve None si se descarta o queda vacía"""
+        return self.limpiar(linea).strip("\n") or None
+
+
+# Respuestas del LLM en story_fetcher: metadatos del análisis y marcas de formato
+MOTOR_RESPUESTA_LLM = MotorLimpieza(
+    descartar=[
+        "**Género",
+        "Recursos literarios",
+        "Terror psicológico",
+        "misterio sobrenatural",
+        "Presagios",
+        "narrador poco fiable",
+        "atmósfera claustrofóbica",
+        "[Género",
+        "**Título",
+    ],
+    lineas_exactas=["---"],
+    eliminar_caracteres="[]*",
+    recortar_lineas=True,
+    quitar_vacias=True,
+)
+
+# Texto para el TTS en audio_generator: además quita símbolos que se leerían en voz alta
+MOTOR_AUDIO = MotorLimpieza(
+    descartar=[
+        "Género detectado",
+        "Recursos literarios",
+        "Terror psicológico",
+        "misterio sobrenatural",
+        "Presagios",
+        "narrador poco fiable",
+        "atmósfera claustrofóbica",
+    ],
+    eliminar_caracteres="[]*#>-",
+    eliminar_cadenas=[
+        "[Texto mejorado aquí]",
+        "[Título mejorado]",
+        "Texto mejorado:",
+        "Título mejorado:",
+    ],
+    descartar_tras_eliminar=True,
+)
+
+
+def _limpiar_respuesta_anterior(texto):
+    """Implementación anterior de story_fetcher, solo para comparar rendimiento"""
+    lineas_filtradas = []
+    for linea in texto.splitlines():
+        if ("**Género" in linea or
+            "Recursos literarios" in linea or
+            "Terror psicológico" in linea or
+            "misterio sobrenatural" in linea or
+            "Presagios" in linea or
+            "narrador poco fiable" in linea or
+            "atmósfera claustrofóbica" in linea or
+            "---" == linea.strip() or
+            "[Género" in linea or
+            "**Título" in linea):
+            continue
+        linea_limpia = linea.replace("[", "").replace("]", "").replace("*", "").strip()
+        if linea_limpia:
+            lineas_filtradas.append(linea_limpia)
+    return "\n".join(lineas_filtradas)
+
+
+def _limpiar_audio_anterior(texto):
+    """Implementación anterior de audio_generator, solo para comparar rendimiento"""
+    for cadena in ["[Texto mejorado aquí]", "[Título mejorado]", "[", "]", "*", "#", ">", "-",
+                   "Texto mejorado:", "Título mejorado:"]:
+        texto = texto.replace(cadena, "")
+    lineas_filtradas = []
+    for linea in texto.splitlines():
+        if ("Género detectado" in linea or
+            "Recursos literarios" in linea or
+            "Terror psicológico" in linea or
+            "misterio sobrenatural" in linea or
+            "Presagios" in linea or
+            "narrador poco fiable" in linea or
+            "atmósfera claustrofóbica" in linea or
+            "---" == linea.strip()):
+            continue
+        lineas_filtradas.append(linea)
+    return "\n".join(lineas_filtradas).strip()
+
+
+def comparar_rendimiento(megabytes=5, repeticiones=3):
+    """Micro-benchmark: MotorLimpieza frente a la implementación anterior
+
+    Genera un texto sintético de ``megabytes`` MB con el tipo de líneas que
+    devuelve el LLM y mide el rendimiento (MB/s) de cada implementación.
+    """
+    # Una respuesta típica: unas líneas de análisis y muchos párrafos de prosa
+    prosa = (
+        "Aquella noche el viento golpeaba las ventanas con un ritmo casi humano, "
+        "y el olor a humedad subía desde el sótano como un aliento antiguo.\n"
+        "   Escuché pasos en el piso de arriba -aunque vivía solo- y me quedé inmóvil.\n"
+        "\n"
+        "Nadie respondió cuando pregunté quién estaba ahí. Solo el *crujido* de la madera.\n"
+    )
+    muestra = (
+        "**Género: terror psicológico con narrador poco fiable\n"
+        "Título mejorado: **La casa del final de la calle**\n"
+        "---\n"
+        + prosa * 20
+        + "> [Nota] Continuará... #miedo\n"
+    )
+    texto = muestra * int(megabytes * 1024 * 1024 / len(muestra.encode("utf-8")))
+    tamano_mb = len(texto.encode("utf-8")) / (1024 * 1024)
+
+    casos = [
+        ("respuesta LLM", _limpiar_respuesta_anterior, MOTOR_RESPUESTA_LLM.limpiar),
+        ("audio", _limpiar_audio_anterior, lambda t: MOTOR_AUDIO.limpiar(t).strip()),
+    ]
+    for nombre, anterior, nuevo in casos:
+        if anterior(texto) != nuevo(texto):
+            print(f"⚠️ {nombre}: los resultados difieren")
+        for etiqueta, funcion in (("anterior", anterior), ("motor", nuevo)):
+            mejor = min(_medir(funcion, texto) for _ in range(repeticiones))
+            print(f"{nombre:14} {etiqueta:10} {tamano_mb / mejor:8.1f} MB/s ({mejor * 1000:.1f} ms)")
+
+
+def _medir(funcion, texto):
+    inicio = time.perf_counter()
+    funcion(texto)
+    return time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    comparar_rendimiento()
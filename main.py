@@ -7,10 +7,14 @@ import json
 import colorama
 from colorama import Fore, Back, Style
 from dotenv import load_dotenv
+from grabadora_http import activar_desde_entorno
 
 # Cargar variables de entorno
 load_dotenv()
 
+# Grabar o reproducir las llamadas a servicios externos (GRABADORA_MODO)
+activar_desde_entorno()
+
 # Inicializar colorama para Windows
 colorama.init()
 
@@ -207,8 +211,12 @@ def generar_audio():
         input("Presiona Enter para continuar...")
         return False
 
-def integrar_video():
-    """Integra un video con el audio de la historia actual"""
+def integrar_video(en_flujo=False):
+    """Integra un video con el audio de la historia actual
+    
+    Con ``en_flujo`` la narración se genera durante la integración, a la vez
+    que se codifica el video.
+    """
     try:        
         if not historia_actual["id"]:
             print(f"{Fore.RED}❌ No hay ninguna historia activa. Primero obtén una historia.{Style.RESET_ALL}")
@@ -222,10 +230,12 @@ def integrar_video():
         
         # Importar y ejecutar la integración de video
         from video_integrator_new import integrar_video as integrar
-        integrar(historia_actual["id"])
+        integrar(historia_actual["id"], en_flujo=en_flujo)
         
         # Actualizar estado
         historia_actual["paso_actual"] = 3
+        if en_flujo and "Generar audio" not in historia_actual["pasos_completados"]:
+            historia_actual["pasos_completados"].append("Generar audio")
         if "Integrar video" not in historia_actual["pasos_completados"]:
             historia_actual["pasos_completados"].append("Integrar video")
         
@@ -245,12 +255,14 @@ def ejecutar_todos_pasos():
     if not obtener_historia():
         return
     
-    # Paso 2: Generar audio
-    if not generar_audio():
+    # Paso 2: Generar audio (con NARRACION_EN_FLUJO=1 se genera en el paso 3,
+    # enviando el audio a ffmpeg mientras se sintetiza)
+    en_flujo = os.getenv("NARRACION_EN_FLUJO", "0") == "1"
+    if not en_flujo and not generar_audio():
         return
     
     # Paso 3: Integrar video
-    if not integrar_video():
+    if not integrar_video(en_flujo):
         return
         
     # Todo completado
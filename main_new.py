@@ -7,10 +7,14 @@ import json
 import colorama
 from colorama import Fore, Back, Style
 from dotenv import load_dotenv
+from grabadora_http import activar_desde_entorno
 
 # Cargar variables de entorno
 load_dotenv()
 
+# Grabar o reproducir las llamadas a servicios externos (GRABADORA_MODO)
+activar_desde_entorno()
+
 # Inicializar colorama para Windows
 colorama.init()
 
@@ -0,0 +1,111 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+
+def normalizar_oracion(oracion):
+    """Normaliza una oración para usarla como clave de la memoria
+
+    Se unifican la forma Unicode y los espacios; las mayúsculas se conservan
+    porque cambian la traducción (nombres propios, inicio de frase).
+    """
+    oracion = unicodedata.normalize("NFC", oracion)
+    return re.sub(r"\s+", " ", oracion).strip()
+
+
+class MemoriaTraduccion:
+    """Memoria de traducción persistente por oración con expulsión LRU
+
+    Las entradas se indexan por (idioma destino, oración normalizada) y se
+    guardan en SQLite. Cuando se supera ``max_entradas`` se eliminan las menos
+    usadas recientemente. Los contadores de aciertos y fallos son del proceso
+    actual.
+    """
+
+    def __init__(self, ruta_db, max_entradas=50000):
+        carpeta = os.path.dirname(ruta_db)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self.ruta_db = ruta_db
+        self.max_entradas = max_entradas
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta_db, timeout=30, check_same_thread=False)
+        with self._lock, self._conexion:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute(
+                """
+                CREATE TABLE IF NOT EXISTS traducciones (
+                    clave TEXT PRIMARY KEY,
+                    destino TEXT NOT NULL,
+                    origen TEXT NOT NULL,
+                    traduccion TEXT NOT NULL,
+                    ultimo_uso REAL NOT NULL
+                )
+                """
+            )
+            self._conexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_traducciones_uso ON traducciones (ultimo_uso)"
+            )
+
+    @staticmethod
+    def _clave(oracion, destino):
+        normalizada = normalizar_oracion(oracion)
+        return hashlib.sha1(f"{destino}\0{normalizada}".encode("utf-8")).hexdigest()
+
+    def obtener(self, oracion, destino="es"):
+        """Devuelve la traducción guardada o None si no está en la memoria"""
+        clave = self._clave(oracion, destino)
+        with self._lock, self._conexion:
+            fila = self._conexion.execute(
+                "SELECT traduccion FROM traducciones WHERE clave = ?", (clave,)
+            ).fetchone()
+            if fila is None:
+                self.fallos += 1
+                return None
+            self.aciertos += 1
+            self._conexion.execute(
+                "UPDATE traducciones SET ultimo_uso = ? WHERE clave = ?", (time.time(), clave)
+            )
+            return fila[0]
+
+    def guardar(self, oracion, traduccion, destino="es"):
+        """Guarda la traducción de una oración y aplica la expulsión LRU"""
+        clave = self._clave(oracion, destino)
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO traducciones (clave, destino, origen, traduccion, ultimo_uso) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (clave, destino, normalizar_oracion(oracion), traduccion, time.time()),
+            )
+            total = self._conexion.execute("SELECT COUNT(*) FROM traducciones").fetchone()[0]
+            exceso = total - self.max_entradas
+            if exceso > 0:
+                self._conexion.execute(
+                    "DELETE FROM traducciones WHERE clave IN "
+                    "(SELECT clave FROM traducciones ORDER BY ultimo_uso LIMIT ?)",
+                    (exceso,),
+                )
+
+    def __len__(self):
+        with self._lock:
+            return self._conexion.execute("SELECT COUNT(*) FROM traducciones").fetchone()[0]
+
+    def estadisticas(self):
+        """Devuelve un diccionario con aciertos, fallos, tasa de acierto y tamaño"""
+        consultas = self.aciertos + self.fallos
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_acierto": self.aciertos / consultas if consultas else 0.0,
+            "entradas": len(self),
+        }
+
+    def cerrar(self):
+        with self._lock:
+            self._conexion.close()
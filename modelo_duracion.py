@@ -0,0 +1,105 @@
+import json
+import os
+import re
+import threading
+
+PALABRAS_POR_MINUTO_BASE = 150  # Ritmo de lectura promedio sin calibrar
+_PATRON_PAUSA = re.compile(r"[.,;:!?…]")
+
+
+def rasgos_texto(texto):
+    """Devuelve (caracteres, pausas): lo que más influye en la duración hablada"""
+    caracteres = sum(1 for caracter in texto if not caracter.isspace())
+    return caracteres, len(_PATRON_PAUSA.findall(texto))
+
+
+def _factor_velocidad(rate):
+    """Convierte un rate de Edge TTS ("-10%") en un factor multiplicativo (0.9)"""
+    try:
+        return 1 + float((rate or "+0%").rstrip("%")) / 100
+    except ValueError:
+        return 1.0
+
+
+class ModeloDuracion:
+    """Modelo calibrado de la duración de la narración para cada voz
+
+    Por cada voz (y velocidad) se ajusta por mínimos cuadrados
+    ``segundos ≈ a·caracteres + b·pausas`` con las duraciones medidas de las
+    síntesis anteriores. Solo se guardan las sumas de las ecuaciones normales,
+    así que el archivo no crece con el número de muestras. Mientras una voz
+    tenga menos de ``minimo_muestras`` se usa el ritmo base de 150 palabras
+    por minuto ajustado por la velocidad.
+
+    Args:
+        ruta_json: Archivo donde se guarda el modelo
+        minimo_muestras: Síntesis medidas necesarias para usar el ajuste
+    """
+
+    def __init__(self, ruta_json, minimo_muestras=3):
+        self.ruta_json = ruta_json
+        self.minimo_muestras = minimo_muestras
+        self._lock = threading.Lock()
+        self._voces = {}
+        if os.path.exists(ruta_json):
+            try:
+                with open(ruta_json, "r", encoding="utf-8") as f:
+                    self._voces = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ No se pudo leer el modelo de duración: {e}")
+
+    @staticmethod
+    def clave_voz(voz, rate=None):
+        return f"{voz}|{rate or '+0%'}"
+
+    def registrar(self, clave_voz, texto, segundos):
+        """Añade la duración medida de una síntesis y guarda el modelo"""
+        caracteres, pausas = rasgos_texto(texto)
+        if not caracteres or segundos <= 0:
+            return
+        with self._lock:
+            sumas = self._voces.setdefault(
+                clave_voz, {"muestras": 0, "cc": 0, "cp": 0, "pp": 0, "cy": 0, "py": 0}
+            )
+            sumas["muestras"] += 1
+            sumas["cc"] += caracteres * caracteres
+            sumas["cp"] += caracteres * pausas
+            sumas["pp"] += pausas * pausas
+            sumas["cy"] += caracteres * segundos
+            sumas["py"] += pausas * segundos
+            datos = {voz: dict(valores) for voz, valores in self._voces.items()}
+        try:
+            carpeta = os.path.dirname(self.ruta_json)
+            if carpeta:
+                os.makedirs(carpeta, exist_ok=True)
+            temporal = f"{self.ruta_json}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(datos, f, indent=2)
+            os.replace(temporal, self.ruta_json)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el modelo de duración: {e}")
+
+    def coeficientes(self, clave_voz):
+        """Devuelve (segundos por carácter, segundos por pausa) o None sin calibrar"""
+        with self._lock:
+            sumas = dict(self._voces.get(clave_voz) or {})
+        if sumas.get("muestras", 0) < self.minimo_muestras:
+            return None
+        determinante = sumas["cc"] * sumas["pp"] - sumas["cp"] ** 2
+        if abs(determinante) > 1e-9:
+            a = (sumas["cy"] * sumas["pp"] - sumas["py"] * sumas["cp"]) / determinante
+            b = (sumas["py"] * sumas["cc"] - sumas["cy"] * sumas["cp"]) / determinante
+            if a > 0 and b >= 0:
+                return a, b
+        # Sin pausas suficientes para separar su efecto: solo caracteres
+        return sumas["cy"] / sumas["cc"], 0.0
+
+    def predecir(self, clave_voz, texto):
+        """Segundos estimados de narración del texto con la voz indicada"""
+        coeficientes = self.coeficientes(clave_voz)
+        if coeficientes is None:
+            rate = clave_voz.partition("|")[2] if clave_voz else None
+            palabras_por_minuto = PALABRAS_POR_MINUTO_BASE * _factor_velocidad(rate)
+            return len(texto.split()) / palabras_por_minuto * 60
+        caracteres, pausas = rasgos_texto(texto)
+        return coeficientes[0] * caracteres + coeficientes[1] * pausas
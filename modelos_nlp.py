@@ -0,0 +1,97 @@
+import subprocess
+import sys
+import threading
+
+MODELO_ESPANOL = "es_core_news_sm"
+
+# Perfiles de carga: componentes del pipeline que no se cargan en cada uso.
+# El modelo es_core_news_sm trae tok2vec, morphologizer, parser,
+# attribute_ruler, lemmatizer y ner.
+PERFILES_SPACY = {
+    # Pipeline completo
+    "completo": [],
+    # Etiquetas gramaticales (pos_) y stopwords, p. ej. para palabras clave
+    "etiquetador": ["parser", "lemmatizer", "ner"],
+    # Solo tokenización: no necesita cargar el modelo entrenado
+    "tokenizador": None,
+}
+
+_modelos_spacy = {}
+_recursos_nltk = set()
+_lock = threading.Lock()
+
+
+def _cargar_modelo_spacy(excluir):
+    import spacy
+
+    try:
+        return spacy.load(MODELO_ESPANOL, exclude=excluir)
+    except OSError:
+        print(f"⚠️ No se encontró el modelo de spaCy '{MODELO_ESPANOL}'. Intentando descargarlo...")
+    try:
+        subprocess.run([sys.executable, "-m", "spacy", "download", MODELO_ESPANOL], check=True)
+        modelo = spacy.load(MODELO_ESPANOL, exclude=excluir)
+        print("✅ Modelo de spaCy descargado e instalado correctamente")
+        return modelo
+    except Exception as e:
+        print(f"❌ Error al descargar el modelo: {str(e)}")
+        print("⚠️ Usando un modelo genérico como alternativa...")
+        return spacy.blank("es")  # Usar un modelo genérico si no se puede descargar
+
+
+def obtener_spacy(perfil="completo"):
+    """Devuelve el pipeline de spaCy del perfil indicado, cargándolo una sola vez
+
+    Los modelos se cargan la primera vez que se piden y se reutilizan en todo
+    el proceso, de modo que importar un módulo no paga el coste de cargar
+    spaCy y cada historia no vuelve a cargar el modelo.
+
+    Args:
+        perfil: Clave de PERFILES_SPACY ("completo", "etiquetador" o
+            "tokenizador")
+
+    Returns:
+        Objeto Language de spaCy
+    """
+    if perfil not in PERFILES_SPACY:
+        raise ValueError(f"Perfil de spaCy desconocido: {perfil}")
+
+    modelo = _modelos_spacy.get(perfil)
+    if modelo is not None:
+        return modelo
+
+    with _lock:
+        modelo = _modelos_spacy.get(perfil)
+        if modelo is None:
+            excluir = PERFILES_SPACY[perfil]
+            if excluir is None:
+                import spacy
+
+                modelo = spacy.blank("es")
+            else:
+                modelo = _cargar_modelo_spacy(excluir)
+                print(f"✅ Modelo de spaCy cargado correctamente (perfil {perfil})")
+            _modelos_spacy[perfil] = modelo
+    return modelo
+
+
+def asegurar_nltk(*recursos):
+    """Descarga los recursos de NLTK indicados solo si no están instalados
+
+    Args:
+        recursos: Rutas de recurso de NLTK, p. ej. "tokenizers/punkt" o
+            "corpora/stopwords"
+    """
+    pendientes = [recurso for recurso in recursos if recurso not in _recursos_nltk]
+    if not pendientes:
+        return
+
+    import nltk
+
+    with _lock:
+        for recurso in pendientes:
+            try:
+                nltk.data.find(recurso)
+            except LookupError:
+                nltk.download(recurso.rsplit("/", 1)[-1], quiet=True)
+            _recursos_nltk.add(recurso)
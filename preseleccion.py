@@ -0,0 +1,95 @@
+import math
+import os
+from itertools import islice
+
+# Parámetros del ranking, configurables desde el .env
+PALABRAS_POR_MINUTO = float(os.getenv("PALABRAS_POR_MINUTO", "150"))
+DURACION_OBJETIVO_MIN = float(os.getenv("DURACION_OBJETIVO_MIN", "10"))
+DURACION_MINIMA_MIN = float(os.getenv("DURACION_MINIMA_MIN", "3"))
+DURACION_MAXIMA_MIN = float(os.getenv("DURACION_MAXIMA_MIN", "30"))
+PUNTUACION_MINIMA_REDDIT = int(os.getenv("PUNTUACION_MINIMA_REDDIT", "0"))
+FLAIRS_EXCLUIDOS = {
+    flair.strip().lower()
+    for flair in os.getenv("FLAIRS_EXCLUIDOS", "").split(",")
+    if flair.strip()
+}
+
+
+def estimar_minutos_narracion(texto, palabras_por_minuto=None):
+    """Estima los minutos de narración de un texto a partir de sus palabras"""
+    palabras = len((texto or "").split())
+    return palabras / (palabras_por_minuto or PALABRAS_POR_MINUTO)
+
+
+def puntuar_post(post):
+    """Puntúa un post usando solo los metadatos del listado
+
+    No hace ninguna petición: usa el texto ya incluido en el listado, la
+    puntuación, el ratio de votos y el flair.
+
+    Returns:
+        Tupla (puntuacion, minutos) o None si el post no encaja (duración
+        fuera de rango, flair excluido o puntuación demasiado baja)
+    """
+    minutos = estimar_minutos_narracion(getattr(post, "selftext", ""))
+    if not DURACION_MINIMA_MIN <= minutos <= DURACION_MAXIMA_MIN:
+        return None
+
+    flair = (getattr(post, "link_flair_text", None) or "").strip().lower()
+    if flair and flair in FLAIRS_EXCLUIDOS:
+        return None
+
+    score = getattr(post, "score", 0) or 0
+    if score < PUNTUACION_MINIMA_REDDIT:
+        return None
+    ratio = getattr(post, "upvote_ratio", 1.0) or 0.0
+
+    # Interés: crece con el logaritmo de los votos y se pondera por el ratio
+    interes = math.log1p(max(score, 0)) * ratio
+    # Ajuste: 1 si dura justo lo objetivo, decrece linealmente al alejarse
+    ajuste = max(0.0, 1 - abs(minutos - DURACION_OBJETIVO_MIN) / DURACION_OBJETIVO_MIN)
+    return round((1 + interes) * (0.5 + ajuste), 4), minutos
+
+
+def candidatos_priorizados(posts, cantidad, reserva=None, validar=None, devolver=None):
+    """Ordena el flujo de candidatos por puntuación antes del trabajo costoso
+
+    Toma bloques de ``reserva`` posts del iterable, descarta los que no encajan
+    en la duración objetivo y entrega el resto de mejor a peor. Si el
+    consumidor necesita más (porque alguno falla), se puntúa el siguiente
+    bloque.
+
+    Args:
+        posts: Iterable de posts de PRAW
+        cantidad: Historias que se quieren obtener
+        reserva: Posts puntuados por bloque (por defecto 4 por historia, mínimo 20)
+        validar: Función opcional que recibe el bloque y devuelve los posts
+            que siguen disponibles, p. ej. refrescar_en_lote
+        devolver: Función opcional que recibe los posts puntuados que no se
+            llegaron a entregar cuando el consumidor deja de pedir (p. ej.
+            CosechadorReddit.devolver, para no perderlos)
+    """
+    reserva = reserva or max(20, cantidad * 4)
+    posts = iter(posts)
+    while True:
+        bloque = list(islice(posts, reserva))
+        if not bloque:
+            return
+        if validar is not None:
+            bloque = validar(bloque)
+        puntuados = []
+        for post in bloque:
+            resultado = puntuar_post(post)
+            if resultado is not None:
+                puntuados.append((resultado[0], resultado[1], post))
+        puntuados.sort(key=lambda item: item[0], reverse=True)
+        print(f"📊 Preselección: {len(puntuados)} de {len(bloque)} posts encajan en la duración objetivo")
+        entregados = 0
+        try:
+            for puntuacion, minutos, post in puntuados:
+                print(f"   • {puntuacion:.2f} pts, ~{minutos:.1f} min: {post.title}")
+                entregados += 1
+                yield post
+        finally:
+            if devolver is not None and entregados < len(puntuados):
+                devolver([post for _, _, post in puntuados[entregados:]])
@@ -0,0 +1,109 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class RegistroHistorias:
+    """Índice persistente (SQLite) de posts de Reddit ya procesados
+
+    Cada post se guarda con el ``historia_id`` en el que se convirtió. La
+    consulta por ``post_id`` usa la clave primaria, así que es O(1) en la
+    práctica, y el modo WAL permite que varios procesos escriban a la vez.
+
+    Un post pasa por dos estados:
+        - reservado: un proceso está trabajando en él (historia_id NULL)
+        - registrado: ya tiene una historia asociada
+
+    Las reservas caducan tras ``caducidad_reserva`` segundos para que un
+    proceso que murió a mitad de camino no bloquee el post para siempre.
+    """
+
+    def __init__(self, ruta_db, caducidad_reserva=3600):
+        carpeta = os.path.dirname(ruta_db)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self.ruta_db = ruta_db
+        self.caducidad_reserva = caducidad_reserva
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta_db, timeout=30, check_same_thread=False)
+        with self._lock, self._conexion:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute(
+                """
+                CREATE TABLE IF NOT EXISTS posts (
+                    post_id TEXT PRIMARY KEY,
+                    historia_id TEXT,
+                    fecha REAL NOT NULL
+                )
+                """
+            )
+
+    def __contains__(self, post_id):
+        """Indica si el post ya está registrado o reservado por otro proceso"""
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT historia_id, fecha FROM posts WHERE post_id = ?", (post_id,)
+            ).fetchone()
+        if fila is None:
+            return False
+        historia_id, fecha = fila
+        return historia_id is not None or not self._reserva_caducada(fecha)
+
+    def __len__(self):
+        with self._lock:
+            return self._conexion.execute(
+                "SELECT COUNT(*) FROM posts WHERE historia_id IS NOT NULL"
+            ).fetchone()[0]
+
+    def _reserva_caducada(self, fecha):
+        return time.time() - fecha > self.caducidad_reserva
+
+    def reservar(self, post_id):
+        """Reserva el post de forma atómica
+
+        Returns:
+            True si este proceso debe procesarlo, False si ya está registrado o
+            reservado por otro
+        """
+        ahora = time.time()
+        with self._lock, self._conexion:
+            cursor = self._conexion.execute(
+                "INSERT OR IGNORE INTO posts (post_id, historia_id, fecha) VALUES (?, NULL, ?)",
+                (post_id, ahora),
+            )
+            if cursor.rowcount:
+                return True
+            # Recuperar reservas abandonadas
+            cursor = self._conexion.execute(
+                "UPDATE posts SET fecha = ? WHERE post_id = ? AND historia_id IS NULL AND fecha < ?",
+                (ahora, post_id, ahora - self.caducidad_reserva),
+            )
+            return cursor.rowcount > 0
+
+    def liberar(self, post_id):
+        """Elimina la reserva de un post que no se pudo procesar"""
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                "DELETE FROM posts WHERE post_id = ? AND historia_id IS NULL", (post_id,)
+            )
+
+    def registrar(self, post_id, historia_id):
+        """Marca el post como procesado y guarda la historia que generó"""
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO posts (post_id, historia_id, fecha) VALUES (?, ?, ?)",
+                (post_id, historia_id, time.time()),
+            )
+
+    def historia_de(self, post_id):
+        """Devuelve el historia_id asociado al post o None"""
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT historia_id FROM posts WHERE post_id = ?", (post_id,)
+            ).fetchone()
+        return fila[0] if fila else None
+
+    def cerrar(self):
+        with self._lock:
+            self._conexion.close()
@@ -7,10 +7,9 @@ import json
 import nltk
 from pexelsapi.pexels import Pexels
 from dotenv import load_dotenv
+from modelos_nlp import asegurar_nltk
 
 load_dotenv()                                    # .env con PEXELS_API_KEY
-nltk.download('punkt', quiet=True)               # 1ª vez descarga corpora
-nltk.download('stopwords', quiet=True)
 
 
 PEXELS_KEY = os.getenv('PEXELS_API_KEY') or os.getenv('PEXEL_API_KEY')
@@ -19,6 +18,8 @@ if not PEXELS_KEY:
 
 # ---------- utilidades -------------------------------------------------- #
 def _keywords(text: str, n: int = 5) -> list[str]:
+    # 1ª vez descarga corpora; después solo comprueba que existen
+    asegurar_nltk('tokenizers/punkt', 'tokenizers/punkt_tab', 'corpora/stopwords')
     tokens = [t.lower() for t in nltk.word_tokenize(text) if t.isalpha()]
     stop = set(nltk.corpus.stopwords.words('spanish'))
     fdist = nltk.FreqDist([t for t in tokens if t not in stop])
@@ -132,7 +133,9 @@ def crear_video(historia_id: str) -> str:
         return None
         
     with open(texto_path, encoding='utf-8') as f:
-        texto = f.read()    api = Pexels(PEXELS_KEY)
+        texto = f.read()
+
+    api = Pexels(PEXELS_KEY)
     clips = []
     for kw in _keywords(texto, 6):
         videos = api.search_videos(query=kw, orientation="portrait", page=1, per_page=3)
@@ -161,7 +164,9 @@ def crear_video(historia_id: str) -> str:
     dur_audio = float(subprocess.check_output(
         ["ffprobe", "-v", "error", "-show_entries",
          "format=duration", "-of", "default=noprint_wrappers=1:nokey=1",
-         audio_path]).strip())    # 3) loopear video hasta cubrir audio
+         audio_path]).strip())
+
+    # 3) loopear video hasta cubrir audio
     loop_mp4 = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4').name
     subprocess.run(
         ["ffmpeg", "-y", "-stream_loop", "-1", "-i", concat_mp4,
@@ -170,7 +175,10 @@ def crear_video(historia_id: str) -> str:
     )
     
     # Convertir a formato vertical para TikTok
-    loop_mp4_vertical = _convertir_a_vertical(loop_mp4)    # 4) silenciar y poner narración    # Usamos libx264 en lugar de copy para evitar problemas de compatibilidad
+    loop_mp4_vertical = _convertir_a_vertical(loop_mp4)
+
+    # 4) silenciar y poner narración
+    # Usamos libx264 en lugar de copy para evitar problemas de compatibilidad
     subprocess.run(
         ["ffmpeg", "-y", "-i", loop_mp4_vertical, "-i", audio_path,
          "-c:v", "libx264", "-preset", "medium", "-c:a", "aac", "-shortest", salida_final],
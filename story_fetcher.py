@@ -1,12 +1,25 @@
 import praw
-import requests
 import os
 import uuid
 import json
+import re
+import threading
+from types import GeneratorType
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from deep_translator import GoogleTranslator
-import spacy
-from openai import OpenAI
 from dotenv import load_dotenv
+from registro_historias import RegistroHistorias
+from detector_duplicados import DetectorDuplicados
+from detector_idioma import detectar_idioma_local
+from cache_llm import CacheLLM, clave_respuesta
+from cliente_llm import ClienteLLM
+from cosechador_reddit import CosechadorReddit
+from cliente_reddit import ClienteListadosJSON, refrescar_en_lote
+from volcados_reddit import leer_volcado
+from preseleccion import candidatos_priorizados
+from limpieza_texto import MOTOR_RESPUESTA_LLM
+from latencias_llm import EstadisticasLatencia
+from memoria_traduccion import MemoriaTraduccion, normalizar_oracion
 
 # Cargar variables de entorno
 load_dotenv()
@@ -20,6 +33,51 @@ reddit = praw.Reddit(
     password=os.getenv("REDDIT_PASSWORD"),
 )
 
+# Forma de leer los listados: "praw" o "json" (peticiones condicionales con
+# ETag/If-Modified-Since que devuelven 304 si el listado no cambió)
+reddit_backend = os.getenv("REDDIT_BACKEND", "praw").lower()
+
+
+def _token_reddit():
+    """Devuelve el token OAuth de PRAW, pidiéndolo o renovándolo si hace falta"""
+    autorizador = reddit._core._authorizer
+    if not autorizador.is_valid():
+        autorizador.refresh()
+    return autorizador.access_token
+
+
+cliente_listados = (
+    ClienteListadosJSON(
+        os.getenv("REDDIT_USER_AGENT"),
+        # Con credenciales los listados van autenticados por oauth.reddit.com
+        obtener_token=_token_reddit if os.getenv("REDDIT_CLIENT_ID") else None,
+        ruta_validadores=os.getenv("REDDIT_VALIDADORES_JSON", "historias/validadores_reddit.json"),
+    )
+    if reddit_backend == "json"
+    else None
+)
+
+# Subreddits y listados de los que se obtienen historias (subreddit:listado[:periodo]),
+# paginados con cursores que se conservan entre ejecuciones
+cosechador = CosechadorReddit(
+    reddit,
+    os.getenv("REDDIT_FUENTES", "nosleep:hot"),
+    os.getenv("REDDIT_CURSORES_JSON", "historias/cursores_reddit.json"),
+    tamano_pagina=int(os.getenv("REDDIT_TAMANO_PAGINA", "25")),
+    max_paginas=int(os.getenv("REDDIT_MAX_PAGINAS", "4")),
+    cliente_json=cliente_listados,
+)
+
+# Revalidar cada bloque de candidatos con una petición por cada 100 posts
+# (descarta los borrados y actualiza puntuaciones antes de ordenarlos)
+reddit_validar_en_lote = os.getenv("REDDIT_VALIDAR_EN_LOTE", "0") == "1"
+
+
+def _validar_candidatos(bloque):
+    if not reddit_validar_en_lote:
+        return bloque
+    return refrescar_en_lote(reddit, bloque)
+
 # Configuración de OpenRouter
 openrouter_key = os.getenv("OPENROUTER_API_KEY")
 openrouter_url = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
@@ -28,30 +86,108 @@ openrouter_url = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/
 deepseek_key = os.getenv("DEEPSEEK_API_KEY")
 deepseek_url = os.getenv("DEEPSEEK_URL", "https://api.deepseek.com")
 
-# Configuración de APIs
-client_deepseek = OpenAI(api_key=deepseek_key, base_url=deepseek_url)
+# Modelos usados para reescribir las historias
+MODELO_DEEPSEEK = "deepseek-chat"
+MODELO_OPENROUTER = "openai/gpt-4o-mini"
+
+# Versión de la plantilla del prompt de mejora; cambiarla invalida la caché
+VERSION_PROMPT_MEJORA = 2
+VERSION_PROMPT_TRADUCCION = "traduccion-mejora-1"
+
+# Traducir y reescribir en una sola llamada al LLM las historias que no están
+# en español (sin pasar antes por Google Translate)
+llm_traduccion_directa = os.getenv("LLM_TRADUCCION_DIRECTA", "0") == "1"
+
+# Caché persistente de reescrituras del LLM
+cache_llm_desactivada = os.getenv("CACHE_LLM_DESACTIVADA", "0") == "1"
+cache_respuestas_llm = CacheLLM(
+    os.getenv("CACHE_LLM_DB", "historias/cache_llm.db"),
+    ttl_segundos=int(os.getenv("CACHE_LLM_TTL_DIAS", "30")) * 24 * 3600,
+    max_bytes=int(os.getenv("CACHE_LLM_MAX_MB", "200")) * 1024 * 1024,
+)
+
+# Versiones de los prompts de la reescritura por fragmentos
+VERSION_PROMPT_FRAGMENTO = "fragmento-1"
+VERSION_PROMPT_TITULO = "titulo-1"
+
+# Clase de cada prompt en las estadísticas de latencia: los títulos, los
+# fragmentos y las historias completas tardan cosas muy distintas
+CLASES_PROMPT = {
+    VERSION_PROMPT_MEJORA: "historia",
+    VERSION_PROMPT_TRADUCCION: "traduccion",
+    VERSION_PROMPT_FRAGMENTO: "fragmento",
+    VERSION_PROMPT_TITULO: "titulo",
+}
+
+# Historias más largas que este umbral se reescriben por fragmentos en paralelo
+llm_historia_larga_caracteres = int(os.getenv("LLM_HISTORIA_LARGA_CARACTERES", "12000"))
+llm_fragmento_caracteres = int(os.getenv("LLM_FRAGMENTO_CARACTERES", "6000"))
+llm_fragmentos_concurrencia = max(1, int(os.getenv("LLM_FRAGMENTOS_CONCURRENCIA", "4")))
+
+# Reescribir en streaming, escribiendo historia.txt párrafo a párrafo
+llm_streaming = os.getenv("LLM_STREAMING", "0") == "1"
+
+# Peticiones cubiertas (hedged) al LLM: el respaldo se lanza cuando el
+# proveedor principal supera el percentil indicado de sus latencias
+llm_hedging = os.getenv("LLM_HEDGING", "0") == "1"
+llm_hedge_percentil = float(os.getenv("LLM_HEDGE_PERCENTIL", "95"))
+llm_hedge_espera_inicial = float(os.getenv("LLM_HEDGE_ESPERA_INICIAL", "60"))
+latencias_llm = EstadisticasLatencia(os.getenv("LATENCIAS_LLM_JSON", "historias/latencias_llm.json"))
+_executor_llm = ThreadPoolExecutor(max_workers=8)
+
+# Clientes HTTP de los proveedores: conexiones reutilizadas entre hilos y
+# límites de peticiones/tokens por minuto (0 = sin límite). Las esperas por
+# los límites se registran aparte de la latencia como "proveedor:cola"
+llm_conexiones = int(os.getenv("LLM_CONEXIONES", "8"))
+cliente_deepseek = ClienteLLM(
+    "deepseek",
+    f"{deepseek_url.rstrip('/')}/chat/completions",
+    deepseek_key,
+    MODELO_DEEPSEEK,
+    rpm=int(os.getenv("DEEPSEEK_RPM", "0")),
+    tpm=int(os.getenv("DEEPSEEK_TPM", "0")),
+    conexiones=llm_conexiones,
+    estadisticas=latencias_llm,
+)
+cliente_openrouter = ClienteLLM(
+    "openrouter",
+    openrouter_url,
+    openrouter_key,
+    MODELO_OPENROUTER,
+    rpm=int(os.getenv("OPENROUTER_RPM", "0")),
+    tpm=int(os.getenv("OPENROUTER_TPM", "0")),
+    conexiones=llm_conexiones,
+    estadisticas=latencias_llm,
+)
+
+# Número de posts que se traducen y mejoran en paralelo
+historias_concurrencia = int(os.getenv("HISTORIAS_CONCURRENCIA", "3"))
+
+# Firmas SimHash de las historias procesadas para detectar reposts casi idénticos
+detector_duplicados = DetectorDuplicados(
+    os.getenv("DUPLICADOS_DB", "historias/firmas_historias.db"),
+    distancia_max=int(os.getenv("DUPLICADOS_DISTANCIA_MAX", "3")),
+)
+
+# Confianza mínima para dar un texto por escrito en español y no traducirlo
+umbral_idioma_es = float(os.getenv("UMBRAL_IDIOMA_ES", "0.3"))
+
+# Peticiones simultáneas a GoogleTranslator por texto
+traduccion_concurrencia = max(1, int(os.getenv("TRADUCCION_CONCURRENCIA", "4")))
+
+# Memoria de traducción persistente por oración
+memoria_traducciones = MemoriaTraduccion(
+    os.getenv("MEMORIA_TRADUCCION_DB", "historias/memoria_traduccion.db"),
+    max_entradas=int(os.getenv("MEMORIA_TRADUCCION_MAX", "50000")),
+)
 
 # apikey pexel
 pexel_key = os.getenv("PEXEL_API_KEY")
 
-# Cargar el modelo de spaCy con manejo de errores
-try:
-    nlp = spacy.load("es_core_news_sm")
-    print("✅ Modelo de spaCy cargado correctamente")
-except OSError:
-    print("⚠️ No se encontró el modelo de spaCy 'es_core_news_sm'. Intentando descargarlo...")
-    try:
-        import subprocess
-        subprocess.run(["python", "-m", "spacy", "download", "es_core_news_sm"], check=True)
-        nlp = spacy.load("es_core_news_sm")
-        print("✅ Modelo de spaCy descargado e instalado correctamente")
-    except Exception as e:
-        print(f"❌ Error al descargar el modelo: {str(e)}")
-        print("⚠️ Usando un modelo genérico como alternativa...")
-        nlp = spacy.blank("es")  # Usar un modelo genérico si no se puede descargar
-
-# Mantener un registro de historias consultadas
-historias_consultadas = set()
+# Mantener un registro persistente de historias consultadas (post_id -> historia_id)
+historias_consultadas = RegistroHistorias(
+    os.getenv("REGISTRO_HISTORIAS_DB", "historias/registro_posts.db")
+)
 
 
 def crear_carpeta_historia():
@@ -61,48 +197,149 @@ def crear_carpeta_historia():
     return historia_id, ruta
 
 
-def detectar_idioma(texto):
-    try:
-        if not texto or texto.isspace():
-            print("⚠️ El texto para detectar el idioma está vacío.")
-            return "en"
-        # Intentamos traducir al español. Si funciona sin error, es otro idioma
-        if GoogleTranslator(source="auto", target="es").translate(texto[:100]):
-            return "en"
-        return "es"
-    except Exception as e:
-        print(f"Error detectando idioma: {e}")
-        return "en"
+def detectar_idioma(texto, con_confianza=False):
+    """Detecta el idioma del texto localmente, sin peticiones de red
+
+    Args:
+        texto: Texto a analizar
+        con_confianza: Si es True devuelve también la confianza (0-1)
+
+    Returns:
+        Código del idioma ("es", "en"...) o tupla (idioma, confianza).
+        Un resultado "es" con confianza menor que UMBRAL_IDIOMA_ES se
+        considera "en" para no dejar sin traducir un texto dudoso.
+    """
+    if not texto or texto.isspace():
+        print("⚠️ El texto para detectar el idioma está vacío.")
+        return ("en", 0.0) if con_confianza else "en"
+
+    idioma, confianza = detectar_idioma_local(texto)
+    if idioma == "es" and confianza < umbral_idioma_es:
+        idioma = "en"
+    return (idioma, confianza) if con_confianza else idioma
+
+
+def dividir_en_oraciones(texto):
+    """Divide el texto en párrafos (por línea) y cada párrafo en oraciones
+
+    Returns:
+        Lista de párrafos, cada uno como lista de oraciones (vacía si la línea
+        estaba en blanco)
+    """
+    parrafos = []
+    for linea in texto.splitlines():
+        linea = linea.strip()
+        parrafos.append(re.split(r"(?<=[.!?…])\s+", linea) if linea else [])
+    return parrafos
+
+
+def _traducir_fragmento(texto, max_length=4900):
+    """Traduce un texto con GoogleTranslator respetando el límite del proveedor"""
+    if len(texto) <= max_length:
+        return GoogleTranslator(source="auto", target="es").translate(texto)
+    # Oración excepcionalmente larga: cortar en el último espacio antes del límite
+    trozos = []
+    while len(texto) > max_length:
+        corte = texto.rfind(" ", 0, max_length)
+        if corte <= 0:
+            corte = max_length
+        trozos.append(texto[:corte])
+        texto = texto[corte:].lstrip()
+    trozos.append(texto)
+    return " ".join(
+        GoogleTranslator(source="auto", target="es").translate(trozo) for trozo in trozos
+    )
+
+
+def _traducir_lote(oraciones):
+    """Traduce varias oraciones en una sola petición, una por línea
+
+    Returns:
+        Lista de traducciones alineada con ``oraciones``
+    """
+    traduccion = _traducir_fragmento("\n".join(oraciones))
+    partes = [parte.strip() for parte in (traduccion or "").splitlines() if parte.strip()]
+    if len(partes) == len(oraciones):
+        return partes
+    # El traductor no conservó los saltos de línea: traducir una a una
+    return [_traducir_fragmento(oracion) for oracion in oraciones]
+
+
+def agrupar_en_lotes(oraciones, max_length=4900):
+    """Agrupa oraciones completas en lotes de hasta ``max_length`` caracteres
+
+    Las oraciones nunca se parten entre lotes; una oración más larga que el
+    límite ocupa un lote propio.
+    """
+    lotes = []
+    lote_actual = []
+    longitud_lote = 0
+    for oracion in oraciones:
+        if lote_actual and longitud_lote + len(oracion) + 1 > max_length:
+            lotes.append(lote_actual)
+            lote_actual = []
+            longitud_lote = 0
+        lote_actual.append(oracion)
+        longitud_lote += len(oracion) + 1
+    if lote_actual:
+        lotes.append(lote_actual)
+    return lotes
 
 
 def traducir_a_espanol(texto):
+    """Traduce un texto al español reutilizando la memoria de traducción
+
+    Solo las oraciones que no están en la memoria se envían a GoogleTranslator,
+    agrupadas en peticiones de hasta 4900 caracteres sin partir oraciones. Los
+    lotes se traducen en paralelo (TRADUCCION_CONCURRENCIA hilos) y se
+    reensamblan en orden. Los saltos de línea del texto original se conservan.
+    """
     try:
         if not texto or texto.isspace():
             print("⚠️ El texto para traducir está vacío.")
             return texto
 
-        # Dividir el texto en chunks si es muy largo
         max_length = 4900
-        if len(texto) > max_length:
-            chunks = [
-                texto[i : i + max_length] for i in range(0, len(texto), max_length)
-            ]
-            translated_chunks = []
-            for chunk in chunks:
-                translated_chunk = GoogleTranslator(
-                    source="auto", target="es"
-                ).translate(chunk)
-                translated_chunks.append(translated_chunk)
-            return " ".join(translated_chunks)
-        else:
-            return GoogleTranslator(source="auto", target="es").translate(texto)
+        parrafos = dividir_en_oraciones(texto)
+
+        # Buscar cada oración distinta en la memoria
+        traducciones = {}
+        pendientes = []
+        for oraciones in parrafos:
+            for oracion in oraciones:
+                clave = normalizar_oracion(oracion)
+                if clave in traducciones:
+                    continue
+                guardada = memoria_traducciones.obtener(clave, "es")
+                traducciones[clave] = guardada
+                if guardada is None:
+                    pendientes.append(clave)
+
+        # Traducir los lotes en paralelo; map conserva el orden de los lotes
+        lotes = agrupar_en_lotes(pendientes, max_length)
+        if lotes:
+            with ThreadPoolExecutor(max_workers=min(traduccion_concurrencia, len(lotes))) as executor:
+                for lote, traducidas in zip(lotes, executor.map(_traducir_lote, lotes)):
+                    for oracion, traduccion in zip(lote, traducidas):
+                        traducciones[oracion] = traduccion
+                        memoria_traducciones.guardar(oracion, traduccion, "es")
+
+        reutilizadas = len(traducciones) - len(pendientes)
+        if reutilizadas:
+            print(f"🧠 Memoria de traducción: {reutilizadas} oraciones reutilizadas, {len(pendientes)} traducidas")
+
+        return "\n".join(
+            " ".join(traducciones[normalizar_oracion(oracion)] for oracion in oraciones)
+            for oraciones in parrafos
+        )
     except Exception as e:
         print(f"Error traduciendo texto: {e}")
         return texto
 
 
-def mejorar_historia(titulo, texto):
-    prompt = f"""
+def construir_prompt_mejora(titulo, texto):
+    """Construye el prompt de análisis y reescritura de la historia"""
+    return f"""
     "Eres un experto en análisis literario, narrativa envolvente y storytelling viral. 
 ⮞ Tu doble función será:
    1) **Analizar** la historia para determinar:
@@ -145,259 +382,809 @@ Solo quiero ver:
 2. Historia en las siguientes líneas
 "
     """
+
+
+NOMBRES_IDIOMAS = {
+    "en": "inglés",
+    "pt": "portugués",
+    "fr": "francés",
+    "de": "alemán",
+    "it": "italiano",
+}
+
+
+def construir_prompt_traduccion_mejora(titulo, texto, idioma="en"):
+    """Construye el prompt que traduce al español y reescribe en una sola pasada"""
+    nombre = NOMBRES_IDIOMAS.get(idioma, "otro idioma")
+    return f"""
+    "⮞ La historia original está escrita en {nombre}. Tradúcela al español de forma
+natural (no literal) a la vez que la reescribes según las instrucciones siguientes.
+Toda la salida, título incluido, debe estar en español neutro; conserva en el
+idioma original solo los nombres propios."
+    """ + construir_prompt_mejora(titulo, texto)
+
+
+def _mejorar_con_deepseek(prompt, clase=None, al_despachar=None):
+    return cliente_deepseek.completar(prompt, clase, al_despachar)
+
+
+def _mejorar_con_openrouter(prompt, clase=None, al_despachar=None):
+    return cliente_openrouter.completar(prompt, clase, al_despachar)
+
+
+# Proveedores en orden de preferencia: (nombre, modelo, función)
+PROVEEDORES_LLM = [
+    ("deepseek", MODELO_DEEPSEEK, _mejorar_con_deepseek),
+    ("openrouter", MODELO_OPENROUTER, _mejorar_con_openrouter),
+]
+
+
+def mejorar_historia(titulo, texto, usar_cache=True, idioma_origen="es"):
+    """Reescribe la historia con el LLM (DeepSeek y OpenRouter como respaldo)
+
+    Las respuestas se guardan en una caché persistente direccionada por
+    (proveedor, modelo, versión del prompt, título, texto), de modo que repetir
+    una historia tras un fallo en el audio o el video no vuelve a pagar la
+    reescritura.
+
+    Args:
+        titulo: Título de la historia
+        texto: Texto de la historia
+        usar_cache: Si es False se ignora la caché al leer (la respuesta nueva
+            se guarda igualmente). También se ignora con CACHE_LLM_DESACTIVADA=1
+        idioma_origen: Idioma del título y el texto. Si no es "es" el modelo
+            traduce y reescribe en una sola llamada (solo historias que no
+            son largas)
+
+    Returns:
+        Respuesta en bruto del modelo o None si todos los proveedores fallan
+    """
     try:
-        # Usar DeepSeek como opción principal
-        try:
-            print("✨ Mejorando la historia con DeepSeek...")
-            response = client_deepseek.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": prompt},
-                ],
-                stream=False,
+        if idioma_origen != "es":
+            return _traducir_y_mejorar(titulo, texto, idioma_origen, usar_cache)
+
+        if usar_cache:
+            guardada = buscar_mejora_en_cache(titulo, texto)
+            if guardada:
+                return guardada
+
+        if es_historia_larga(texto):
+            return _mejorar_por_fragmentos(titulo, texto)
+
+        return _completar(construir_prompt_mejora(titulo, texto), titulo, texto)
+
+    except Exception as e:
+        print(f"Error mejorando la historia: {e}")
+        return None
+
+
+def _traducir_y_mejorar(titulo, texto, idioma, usar_cache=True):
+    """Traduce y reescribe en una sola llamada comprobando que la salida es español"""
+    if es_historia_larga(texto):
+        # Los fragmentos se reescriben con prompts en español: se traduce antes
+        return None
+    respuesta = usar_cache and buscar_mejora_en_cache(titulo, texto, VERSION_PROMPT_TRADUCCION)
+    if respuesta and not _respuesta_en_espanol(respuesta):
+        respuesta = None
+    if not respuesta:
+        prompt = construir_prompt_traduccion_mejora(titulo, texto, idioma)
+        # Solo se acepta (y se guarda en caché) una respuesta en español
+        respuesta = _completar(
+            prompt, titulo, texto, VERSION_PROMPT_TRADUCCION, validar=_respuesta_en_espanol
+        )
+    return respuesta or None
+
+
+def _respuesta_en_espanol(respuesta):
+    if detectar_idioma(respuesta) == "es":
+        return True
+    print("⚠️ La respuesta de la traducción directa no está en español")
+    return False
+
+
+def _completar(prompt, titulo, texto, version_prompt=VERSION_PROMPT_MEJORA, validar=None):
+    """Envía el prompt a los proveedores (en cobertura o en serie)
+
+    Si se indica ``validar``, las respuestas que no la cumplen se descartan
+    sin guardarlas en caché, como si el proveedor hubiera fallado.
+    """
+    return _completar_con_origen(prompt, titulo, texto, version_prompt, validar)[0]
+
+
+def _completar_con_origen(prompt, titulo, texto, version_prompt=VERSION_PROMPT_MEJORA, validar=None):
+    """Como _completar, pero devuelve (respuesta, proveedor, modelo)"""
+    if llm_hedging and len(PROVEEDORES_LLM) > 1:
+        return _mejorar_con_cobertura(prompt, titulo, texto, version_prompt, validar)
+    return _mejorar_secuencial(prompt, titulo, texto, version_prompt, validar)
+
+
+def es_historia_larga(texto):
+    """Indica si la historia debe reescribirse por fragmentos"""
+    return len(texto or "") > llm_historia_larga_caracteres
+
+
+def dividir_en_fragmentos(texto, max_caracteres):
+    """Divide el texto en fragmentos de párrafos completos
+
+    Las líneas separadoras de escena (***, ---, * * *) se descartan y fuerzan
+    el inicio de un fragmento nuevo, de modo que los cortes caen en cambios de
+    escena siempre que es posible.
+    """
+    escenas = [[]]
+    for linea in texto.splitlines():
+        linea = linea.strip()
+        if not linea:
+            continue
+        if re.fullmatch(r"[-*_~#\s]{3,}", linea):
+            escenas.append([])
+            continue
+        escenas[-1].append(linea)
+
+    fragmentos = []
+    actual = []
+    longitud = 0
+    for escena in escenas:
+        for lote in agrupar_en_lotes(escena, max_caracteres):
+            tamano = sum(len(parrafo) + 1 for parrafo in lote)
+            # Unir escenas cortas mientras quepan en el fragmento actual
+            if actual and longitud + tamano > max_caracteres:
+                fragmentos.append("\n".join(actual))
+                actual = []
+                longitud = 0
+            actual.extend(lote)
+            longitud += tamano
+    if actual:
+        fragmentos.append("\n".join(actual))
+    return fragmentos
+
+
+def construir_prompt_fragmento(titulo, fragmento, indice, total):
+    """Prompt para reescribir un fragmento con las instrucciones de estilo comunes"""
+    if indice == total:
+        cierre = "Es la última parte: cierra con una incógnita que invite al debate y a futuras entregas."
+    else:
+        cierre = "No cierres la historia: termina exactamente donde termina el fragmento, sin conclusiones."
+    return f"""
+Eres un experto en narrativa envolvente y storytelling viral para podcasts de terror y misterio (público de 18 a 45 años).
+Reescribe en español la parte {indice} de {total} de la historia "{titulo}".
+
+Reglas comunes a todas las partes:
+- Conserva el narrador, el tiempo verbal y todos los hechos clave; solo mejora estructura, lenguaje y tensión.
+- Añade sonidos, olores y atmósferas que intensifiquen la inmersión.
+- No añadas título, resúmenes, análisis, comentarios ni marcas de formato (**, [], ---, emojis).
+- {cierre}
+
+Devuelve solo el texto reescrito del fragmento:
+
+{fragmento}
+"""
+
+
+def construir_prompt_titulo(titulo, inicio):
+    """Prompt corto para proponer el título final a partir del comienzo reescrito"""
+    return f"""
+Propón un título intrigante, emocional y sin spoilers para una historia de terror narrada en un podcast.
+Título original: {titulo}
+Comienzo de la historia: {inicio}
+
+Devuelve únicamente el título en una sola línea, sin comillas ni marcas de formato.
+"""
+
+
+def _mejorar_por_fragmentos(titulo, texto):
+    """Reescritura map-reduce para historias largas
+
+    El texto se divide en fragmentos de LLM_FRAGMENTO_CARACTERES en límites de
+    escena o párrafo, los fragmentos se reescriben en paralelo con las mismas
+    instrucciones de estilo y una última petición corta genera el título. La
+    latencia depende del tamaño del fragmento y no de la longitud total.
+    Cada fragmento (con su posición, que cambia el prompt de la última parte)
+    y el título se guardan en la caché por separado y se reutilizan aunque la
+    historia completa se pida sin caché. Si todos se reescribieron con el
+    mismo proveedor, la respuesta montada se guarda también como la
+    reescritura de la historia completa de ese proveedor y modelo.
+
+    Returns:
+        Respuesta con el título en la primera línea y la historia después, en
+        el mismo formato que la reescritura de una sola petición
+    """
+    fragmentos = dividir_en_fragmentos(texto, llm_fragmento_caracteres)
+    total = len(fragmentos)
+    print(f"🧩 Historia larga: reescribiendo {total} fragmentos en paralelo...")
+
+    def reescribir(args):
+        indice, fragmento = args
+        # La última parte lleva otra instrucción de cierre: la posición va en la clave
+        clave_texto = f"{indice}/{total}\n{fragmento}"
+        guardada, proveedor, modelo = _buscar_en_cache_con_origen(
+            titulo, clave_texto, VERSION_PROMPT_FRAGMENTO
+        )
+        if not guardada:
+            prompt = construir_prompt_fragmento(titulo, fragmento, indice, total)
+            guardada, proveedor, modelo = _completar_con_origen(
+                prompt, titulo, clave_texto, VERSION_PROMPT_FRAGMENTO
             )
-            return response.choices[0].message.content
-        except Exception as e:
-            print(f"Error con DeepSeek: {e}, intentando con OpenRouter...")
+        if not guardada:
+            # Mantener el fragmento original para no perder partes de la historia
+            print(f"⚠️ No se pudo reescribir el fragmento {indice}/{total}, se usa el original")
+            return fragmento, None
+        return guardada.strip(), (proveedor, modelo)
 
-        # Si DeepSeek falla, usar OpenRouter como respaldo
+    with ThreadPoolExecutor(max_workers=min(llm_fragmentos_concurrencia, total)) as executor:
+        resultados = list(executor.map(reescribir, enumerate(fragmentos, 1)))
+
+    cuerpo = "\n".join(reescrito for reescrito, _ in resultados)
+    inicio = cuerpo[:800]
+    titulo_nuevo, proveedor, modelo = _buscar_en_cache_con_origen(titulo, inicio, VERSION_PROMPT_TITULO)
+    if not titulo_nuevo:
+        titulo_nuevo, proveedor, modelo = _completar_con_origen(
+            construir_prompt_titulo(titulo, inicio), titulo, inicio, VERSION_PROMPT_TITULO
+        )
+    origenes = {origen for _, origen in resultados}
+    origenes.add((proveedor, modelo) if titulo_nuevo else None)
+    titulo_nuevo = (titulo_nuevo or titulo).strip().splitlines()[0].strip(" \"'")
+    respuesta = f"{titulo_nuevo}\n{cuerpo}"
+
+    if len(origenes) == 1 and None not in origenes:
+        # Guardada como la reescritura de una sola petición de ese proveedor:
+        # repetir la historia la encuentra directamente, sin volver a montar
+        # fragmentos. Si se mezclaron proveedores no se atribuye a ninguno
+        # (los fragmentos siguen en caché)
+        proveedor, modelo = origenes.pop()
+        clave = clave_respuesta(proveedor, modelo, VERSION_PROMPT_MEJORA, titulo, texto)
+        cache_respuestas_llm.guardar(clave, proveedor, modelo, respuesta)
+    return respuesta
+
+
+def _llamar_proveedor(
+    proveedor, modelo, funcion, prompt, titulo, texto, version_prompt, al_despachar=None, validar=None
+):
+    """Llama a un proveedor y guarda la respuesta en caché
+
+    La latencia la registra el ClienteLLM del proveedor por clase de prompt,
+    sin contar la espera en la cola de los límites de peticiones. Una
+    respuesta que no pasa ``validar`` se descarta sin guardarla.
+    """
+    respuesta = funcion(prompt, CLASES_PROMPT.get(version_prompt), al_despachar)
+    if respuesta and validar is not None and not validar(respuesta):
+        return None
+    if respuesta:
+        clave = clave_respuesta(proveedor, modelo, version_prompt, titulo, texto)
+        cache_respuestas_llm.guardar(clave, proveedor, modelo, respuesta)
+    return respuesta
+
+
+def _mejorar_secuencial(prompt, titulo, texto, version_prompt=VERSION_PROMPT_MEJORA, validar=None):
+    """Prueba los proveedores uno tras otro hasta que alguno responda
+
+    Returns:
+        Tupla (respuesta, proveedor, modelo), con None si ninguno responde
+    """
+    for i, (proveedor, modelo, funcion) in enumerate(PROVEEDORES_LLM):
         try:
-            print("✨ Intentando con OpenRouter como respaldo...")
-            headers = {
-                "Authorization": f"Bearer {openrouter_key}",
-                "Content-Type": "application/json",
-            }
-            data = {
-                "model": "openai/gpt-4o-mini",
-                "messages": [{"role": "user", "content": prompt}],
-            }
-            response = requests.post(openrouter_url, headers=headers, json=data)
-            if response.status_code == 200:
-                return response.json()["choices"][0]["message"]["content"]
+            if i == 0:
+                print(f"✨ Mejorando la historia con {proveedor}...")
+            else:
+                print(f"✨ Intentando con {proveedor} como respaldo...")
+            respuesta = _llamar_proveedor(
+                proveedor, modelo, funcion, prompt, titulo, texto, version_prompt, validar=validar
+            )
         except Exception as e:
-            print(f"Error con OpenRouter: {e}")
-            return None
+            print(f"Error con {proveedor}: {e}")
+            continue
+        if respuesta:
+            return respuesta, proveedor, modelo
+    return None, None, None
+
+
+def _mejorar_con_cobertura(prompt, titulo, texto, version_prompt=VERSION_PROMPT_MEJORA, validar=None):
+    """Petición cubierta: lanza el respaldo si el principal tarda demasiado
+
+    El proveedor principal se lanza de inmediato. Si no ha respondido cuando
+    supera el percentil LLM_HEDGE_PERCENTIL de sus latencias registradas para
+    la misma clase de prompt (o LLM_HEDGE_ESPERA_INICIAL mientras no haya
+    muestras suficientes), o si falla antes, se lanza el siguiente proveedor.
+    El umbral empieza a contar cuando la petición sale hacia el proveedor, no
+    mientras espera un hilo libre o los límites de peticiones. Se devuelve la primera respuesta
+    válida; la otra petición se descarta (si ya está en curso no se puede
+    interrumpir, pero su respuesta acaba en la caché y su latencia en las
+    estadísticas).
+
+    Returns:
+        Tupla (respuesta, proveedor, modelo), con None si ninguno responde
+    """
+    clase = CLASES_PROMPT.get(version_prompt)
+    umbral = latencias_llm.percentil(f"{PROVEEDORES_LLM[0][0]}:{clase}", llm_hedge_percentil)
+    if umbral is None:
+        umbral = llm_hedge_espera_inicial
+
+    pendientes = list(PROVEEDORES_LLM)
+    en_curso = {}
+
+    def lanzar_siguiente():
+        proveedor, modelo, funcion = pendientes.pop(0)
+        despachado = threading.Event()
+        futuro = _executor_llm.submit(
+            _llamar_proveedor,
+            proveedor,
+            modelo,
+            funcion,
+            prompt,
+            titulo,
+            texto,
+            version_prompt,
+            despachado.set,
+            validar,
+        )
+        # Si falla antes de enviarse también deja de esperar
+        futuro.add_done_callback(lambda _: despachado.set())
+        en_curso[futuro] = (proveedor, modelo)
+        return despachado
+
+    print(f"✨ Mejorando la historia con {PROVEEDORES_LLM[0][0]} (respaldo a los {umbral:.1f}s)...")
+    lanzar_siguiente().wait()
+    espera = umbral
+    while en_curso:
+        terminados, _ = wait(list(en_curso), timeout=espera, return_when=FIRST_COMPLETED)
+        espera = None
+        if not terminados:
+            # El principal supera el umbral: cubrir con el siguiente proveedor
+            if pendientes:
+                print(f"⏱️ {PROVEEDORES_LLM[0][0]} supera {umbral:.1f}s, lanzando {pendientes[0][0]}...")
+                lanzar_siguiente()
+            continue
+
+        for futuro in terminados:
+            proveedor, modelo = en_curso.pop(futuro)
+            try:
+                respuesta = futuro.result()
+            except Exception as e:
+                print(f"Error con {proveedor}: {e}")
+                respuesta = None
+            if respuesta:
+                for otro in en_curso:
+                    otro.cancel()
+                print(f"🏁 Respuesta obtenida de {proveedor}")
+                return respuesta, proveedor, modelo
+            # Un proveedor falló: pasar al siguiente sin esperar al umbral
+            if pendientes and not en_curso:
+                lanzar_siguiente()
+    return None, None, None
+
+
+def _mejorar_con_deepseek_stream(prompt):
+    """Igual que _mejorar_con_deepseek pero devuelve los fragmentos según llegan"""
+    yield from cliente_deepseek.completar_stream(prompt)
+
+
+def buscar_mejora_en_cache(titulo, texto, version_prompt=VERSION_PROMPT_MEJORA):
+    """Devuelve una reescritura guardada para cualquier proveedor o None"""
+    return _buscar_en_cache_con_origen(titulo, texto, version_prompt)[0]
+
+
+def _buscar_en_cache_con_origen(titulo, texto, version_prompt=VERSION_PROMPT_MEJORA):
+    """Como buscar_mejora_en_cache, pero devuelve (respuesta, proveedor, modelo)"""
+    if cache_llm_desactivada:
+        return None, None, None
+    for proveedor, modelo, _ in PROVEEDORES_LLM:
+        clave = clave_respuesta(proveedor, modelo, version_prompt, titulo, texto)
+        guardada = cache_respuestas_llm.obtener(clave)
+        if guardada:
+            if version_prompt in (VERSION_PROMPT_MEJORA, VERSION_PROMPT_TRADUCCION):
+                print(f"♻️ Usando la reescritura guardada en caché ({proveedor})")
+            return guardada, proveedor, modelo
+    return None, None, None
+
 
+def mejorar_historia_streaming(titulo, texto, ruta, al_completar_parrafo=None):
+    """Reescribe la historia con DeepSeek en streaming escribiendo historia.txt
+
+    Cada párrafo se filtra y se añade a ``{ruta}/historia.txt`` en cuanto se
+    completa, así las etapas siguientes pueden empezar antes y un corte de la
+    conexión no pierde lo ya generado: el texto parcial se conserva como
+    historia_parcial.txt y se recurre a mejorar_historia sin streaming.
+
+    Args:
+        titulo: Título de la historia
+        texto: Texto de la historia
+        ruta: Carpeta de la historia
+        al_completar_parrafo: Función opcional que recibe cada párrafo escrito
+
+    Returns:
+        Respuesta en bruto del modelo o None si todos los proveedores fallan
+    """
+    archivo = f"{ruta}/historia.txt"
+    filtro = FiltroLineasIncremental()
+    fragmentos = []
+    escritas = 0
+
+    print("✨ Mejorando la historia con DeepSeek (streaming)...")
+    try:
+        with open(archivo, "w", encoding="utf-8") as f:
+
+            def escribir(lineas):
+                nonlocal escritas
+                for linea in lineas:
+                    if escritas == 0:
+                        f.write(linea.replace("Título mejorado:", "").strip())
+                    else:
+                        linea = linea.replace("Texto mejorado:", "").strip()
+                        if not linea:
+                            continue
+                        f.write("\n" + linea)
+                        if al_completar_parrafo:
+                            al_completar_parrafo(linea)
+                    f.flush()
+                    escritas += 1
+
+            for fragmento in _mejorar_con_deepseek_stream(construir_prompt_mejora(titulo, texto)):
+                fragmentos.append(fragmento)
+                escribir(filtro.alimentar(fragmento))
+            escribir(filtro.terminar())
     except Exception as e:
-        print(f"Error mejorando la historia: {e}")
+        print(f"Error con DeepSeek en streaming: {e}")
+        if escritas:
+            os.replace(archivo, f"{ruta}/historia_parcial.txt")
+            print(f"💾 Texto parcial conservado en {ruta}/historia_parcial.txt")
+        return mejorar_historia(titulo, texto, usar_cache=False)
+
+    respuesta = "".join(fragmentos)
+    if respuesta:
+        clave = clave_respuesta("deepseek", MODELO_DEEPSEEK, VERSION_PROMPT_MEJORA, titulo, texto)
+        cache_respuestas_llm.guardar(clave, "deepseek", MODELO_DEEPSEEK, respuesta)
+    return respuesta or None
+
+
+def _limpiar_linea(linea):
+    """Limpia una línea de la respuesta del LLM
+
+    Returns:
+        La línea sin marcadores, o None si es un metadato o está vacía
+    """
+    return MOTOR_RESPUESTA_LLM.limpiar_linea(linea)
+
+
+def limpiar_respuesta_llm(historia_mejorada, titulo, historia):
+    """Separa el título y el texto de la respuesta del LLM eliminando metadatos
+
+    Args:
+        historia_mejorada: Respuesta en bruto del modelo
+        titulo: Título original (se usa si la respuesta no trae uno)
+        historia: Texto original (se usa si la respuesta está vacía)
+
+    Returns:
+        Tupla (titulo_mejorado, texto_mejorado)
+    """
+    # Eliminar metadatos, marcas de formato y líneas vacías en una sola llamada
+    texto_limpio = MOTOR_RESPUESTA_LLM.limpiar(historia_mejorada)
+    lineas_filtradas = texto_limpio.split("\n") if texto_limpio else []
+
+    # La primera línea debe ser el título, el resto es el contenido
+    if lineas_filtradas:
+        titulo_mejorado = lineas_filtradas[0].replace("Título mejorado:", "").strip()
+        texto_mejorado = "\n".join(lineas_filtradas[1:]).replace("Texto mejorado:", "").strip()
+    else:
+        titulo_mejorado = titulo  # Usar el título original si no encontramos uno mejorado
+        texto_mejorado = historia  # Usar la historia original si no encontramos una mejorada
+
+    return titulo_mejorado, texto_mejorado
+
+
+class FiltroLineasIncremental:
+    """Aplica el filtro de limpiar_respuesta_llm a una respuesta en streaming
+
+    Recibe fragmentos de texto de tamaño arbitrario y devuelve las líneas ya
+    completas y limpias en cuanto llega su salto de línea.
+    """
+
+    def __init__(self):
+        self._pendiente = ""
+
+    def alimentar(self, fragmento):
+        """Añade un fragmento y devuelve las líneas limpias que se completaron"""
+        self._pendiente += fragmento
+        *completas, self._pendiente = self._pendiente.split("\n")
+        return [l for l in map(_limpiar_linea, completas) if l]
+
+    def terminar(self):
+        """Procesa la última línea (sin salto final) y devuelve lo que quede"""
+        linea = _limpiar_linea(self._pendiente)
+        self._pendiente = ""
+        return [linea] if linea else []
+
+
+def guardar_historia(historia_id, ruta, titulo_mejorado, texto_mejorado):
+    """Escribe historia.txt, metadata.json e historia.json en la carpeta de la historia"""
+    with open(f"{ruta}/historia.txt", "w", encoding="utf-8") as f:
+        # Guardamos solo el título y el texto mejorado, sin ningún formato
+        f.write(f"{titulo_mejorado}\n{texto_mejorado}")
+
+    with open(f"{ruta}/metadata.json", "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "id": historia_id,
+                "titulo": titulo_mejorado,
+                "ruta": ruta,
+            },
+            f,
+        )
+
+    with open(f"{ruta}/historia.json", "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "título": titulo_mejorado,
+                "historia": texto_mejorado,
+                "descripción": f"📖 {titulo_mejorado}\n\n¡Una historia de terror que te pondrá los pelos de punta! 😱",
+                "hashtags": "#terrorparanodormir #miedoyterror #historiasterror #terror #miedo #paranormal #relatos",
+            },
+            f,
+            ensure_ascii=False,
+            indent=4,
+        )
+
+
+def procesar_post(post, cancelado=None):
+    """Traduce, mejora y guarda un post de Reddit
+
+    Args:
+        post: Submission de PRAW
+        cancelado: threading.Event opcional; si se activa, se abandona el post
+            antes de la siguiente etapa costosa
+
+    Returns:
+        Tupla (historia_id, titulo, texto) o None si el post no se pudo procesar
+    """
+    if not post.selftext:
+        return None
+
+    # Reservar el post antes de cualquier trabajo costoso
+    if not historias_consultadas.reservar(post.id):
+        return None
+
+    # Descartar reposts y cross-posts casi idénticos a una historia ya procesada.
+    # Si es nuevo, la firma queda registrada ya para que otro hilo no procese
+    # un duplicado a la vez
+    original = detector_duplicados.buscar_o_registrar(post.selftext, post.id)
+    if original is not None:
+        historia_original = historias_consultadas.historia_de(original)
+        if historia_original is None:
+            # El original aún se está procesando y puede fallar: el repost no
+            # se marca como duplicado para poder reintentarlo más adelante
+            print(
+                f"♊ El post {post.id} es casi idéntico a {original}, que aún se está "
+                "procesando. Saltando por ahora..."
+            )
+            historias_consultadas.liberar(post.id)
+            return None
+        print(f"♊ El post {post.id} es casi idéntico a {original}. Saltando...")
+        historias_consultadas.registrar(post.id, historia_original)
+        return None
+
+    try:
+        resultado = _procesar_post_reservado(post, cancelado)
+    except Exception:
+        detector_duplicados.eliminar(post.id)
+        historias_consultadas.liberar(post.id)
+        raise
+
+    if resultado is None:
+        detector_duplicados.eliminar(post.id)
+        historias_consultadas.liberar(post.id)
+    else:
+        historias_consultadas.registrar(post.id, resultado[0])
+    return resultado
+
+
+def _procesar_post_reservado(post, cancelado):
+    titulo = post.title
+    historia = post.selftext
+
+    if not historia or historia.isspace():
+        print("❌ El texto de la historia está vacío. Saltando al siguiente post...")
         return None
 
+    print(f"🔄 Procesando historia: {titulo}")
+
+    # Detectar idioma y traducir si es necesario
+    idioma, confianza = detectar_idioma(historia, con_confianza=True)
+    historia_mejorada = None
+    if idioma == "es":
+        print(f"🔍 Idioma detectado: es (confianza {confianza:.2f}). No hace falta traducir.")
+    else:
+        if llm_traduccion_directa and not es_historia_larga(historia):
+            print(f"🔍 Idioma detectado: {idioma} (confianza {confianza:.2f}). Traduciendo y mejorando en una sola llamada...")
+            historia_mejorada = mejorar_historia(titulo, historia, idioma_origen=idioma)
+            if cancelado is not None and cancelado.is_set():
+                return None
+        if not historia_mejorada:
+            print(f"🔍 Idioma detectado: {idioma} (confianza {confianza:.2f}). Traduciendo al español...")
+            titulo = traducir_a_espanol(titulo)
+            historia = traducir_a_espanol(historia)
+
+    if cancelado is not None and cancelado.is_set():
+        return None
+
+    if not historia_mejorada:
+        historia_mejorada = buscar_mejora_en_cache(titulo, historia)
+    if historia_mejorada:
+        historia_id, ruta = crear_carpeta_historia()
+    elif llm_streaming and not es_historia_larga(historia):
+        # La carpeta se crea antes para ir escribiendo historia.txt
+        historia_id, ruta = crear_carpeta_historia()
+        historia_mejorada = mejorar_historia_streaming(titulo, historia, ruta)
+    else:
+        historia_mejorada = mejorar_historia(titulo, historia, usar_cache=False)
+        historia_id, ruta = crear_carpeta_historia()
+    if not historia_mejorada:
+        return None
+
+    titulo_mejorado, texto_mejorado = limpiar_respuesta_llm(historia_mejorada, titulo, historia)
+
+    # Guardar los archivos (historia.txt se reescribe con el texto definitivo)
+    guardar_historia(historia_id, ruta, titulo_mejorado, texto_mejorado)
+
+    print(f"✅ Historia mejorada guardada en {ruta}")
+    return historia_id, titulo_mejorado, texto_mejorado
+
 
 def obtener_historia():
-    historia_id, ruta = crear_carpeta_historia()
     try:
-        subreddit = reddit.subreddit("nosleep")
-        for post in subreddit.hot(limit=20):
-            if post.id in historias_consultadas:
-                continue
-
-            if post.selftext:
-                titulo = post.title
-                historia = post.selftext
-
-                if not historia or historia.isspace():
-                    print(
-                        "❌ El texto de la historia está vacío. Saltando al siguiente post..."
-                    )
+        cosechados = cosechador.candidatos()
+        candidatos = (post for post in cosechados if post.id not in historias_consultadas)
+        # Los candidatos puntuados que no se usan vuelven al cosechador para
+        # la siguiente llamada (o ejecución)
+        priorizados = candidatos_priorizados(
+            candidatos, 1, validar=_validar_candidatos, devolver=cosechador.devolver
+        )
+        try:
+            for post in priorizados:
+                if post.id in historias_consultadas:
                     continue
 
-                idioma = detectar_idioma(historia)
-                if idioma != "es":
-                    print(f"🔍 Idioma detectado: {idioma}. Traduciendo al español...")
-                    titulo = traducir_a_espanol(titulo)
-                    historia = traducir_a_espanol(historia)
-                    print("✨ Mejorando la historia con DeepSeek...")                      
-                    historia_mejorada = mejorar_historia(titulo, historia)
-                if historia_mejorada:
-                    # Procesar la respuesta para eliminar los marcadores entre corchetes
-                    lineas = historia_mejorada.splitlines()
-                    
-                    # Filtrar líneas que contengan metadatos o formatos
-                    lineas_filtradas = []
-                    for linea in lineas:
-                        # Ignorar líneas con metadatos o formatos específicos
-                        if ("**Género" in linea or 
-                            "Recursos literarios" in linea or 
-                            "Terror psicológico" in linea or
-                            "misterio sobrenatural" in linea or
-                            "Presagios" in linea or
-                            "narrador poco fiable" in linea or
-                            "atmósfera claustrofóbica" in linea or
-                            "---" == linea.strip() or
-                            "[Género" in linea or
-                            "**Título" in linea):
-                            continue
-                        
-                        # Limpiar la línea de marcadores
-                        linea_limpia = linea.replace("[", "").replace("]", "").replace("*", "").strip()
-                        if linea_limpia:  # Solo añadir líneas no vacías
-                            lineas_filtradas.append(linea_limpia)
-                    # La primera línea debe ser el título, el resto es el contenido
-                    if lineas_filtradas:
-                        titulo_mejorado = lineas_filtradas[0].replace("Título mejorado:", "").strip()
-                        texto_mejorado = "\n".join(lineas_filtradas[1:]).replace("Texto mejorado:", "").strip()
-                    else:
-                        titulo_mejorado = titulo  # Usar el título original si no encontramos uno mejorado
-                        texto_mejorado = historia  # Usar la historia original si no encontramos una mejorada
-                        
-                    with open(f"{ruta}/historia.txt", "w", encoding="utf-8") as f:
-                        # Guardamos solo el título y el texto mejorado, sin ningún formato
-                        f.write(f"{titulo_mejorado}\n{texto_mejorado}")
-
-                    with open(f"{ruta}/metadata.json", "w", encoding="utf-8") as f:
-                        json.dump(
-                            {
-                                "id": historia_id,
-                                "titulo": titulo_mejorado,
-                                "ruta": ruta,
-                            },
-                            f,
-                        )
-
-                    with open(f"{ruta}/historia.json", "w", encoding="utf-8") as f:
-                        json.dump(
-                            {
-                                "título": titulo_mejorado,
-                                "historia": texto_mejorado,
-                                "descripción": f"📖 {titulo_mejorado}\n\n¡Una historia de terror que te pondrá los pelos de punta! 😱",
-                                "hashtags": "#terrorparanodormir #miedoyterror #historiasterror #terror #miedo #paranormal #relatos",
-                            },
-                            f,
-                            ensure_ascii=False,
-                            indent=4,
-                        )
-
-                    historias_consultadas.add(post.id)
-                    print(f"✅ Historia mejorada guardada en {ruta}")
-                    return historia_id, titulo_mejorado, texto_mejorado
+                resultado = procesar_post(post)
+                if resultado:
+                    return resultado
+        finally:
+            priorizados.close()
+            cosechados.close()
+        return None, None, None
     except Exception as e:
         print(f"Error obteniendo historia: {e}")
         return None, None, None
-        
-def obtener_multiples_historias(cantidad=5):
+
+
+def obtener_multiples_historias(cantidad=5, max_concurrencia=None, posts=None):
     """Obtiene múltiples historias de Reddit
     
+    Los posts candidatos se traducen y mejoran en paralelo (hasta
+    ``max_concurrencia`` a la vez) y el proceso termina en cuanto se han
+    completado ``cantidad`` historias, por lo que el tiempo total depende de la
+    historia más lenta y no de la suma de todas.
+
     Args:
         cantidad: Número de historias a obtener
+        max_concurrencia: Posts procesados simultáneamente (por defecto
+            HISTORIAS_CONCURRENCIA del .env o 3). Con 1 se procesan en serie.
+        posts: Iterable de posts del que sacar los candidatos (por defecto
+            los listados de REDDIT_FUENTES). Estos posts no se revalidan con
+            Reddit (p. ej. los de un volcado) y si es un generador se cierra
+            al terminar
         
     Returns:
         Lista de tuplas (historia_id, titulo, texto)
     """
+    devolver = None
+    validar = None
+    if posts is None:
+        posts = cosechador.candidatos()
+        devolver = cosechador.devolver
+        validar = _validar_candidatos
+    if max_concurrencia is None:
+        max_concurrencia = historias_concurrencia
+    max_concurrencia = max(1, int(max_concurrencia))
+
     historias = []
+    cancelado = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=max_concurrencia)
+    candidatos = None
+    en_curso = {}
     try:
-        subreddit = reddit.subreddit("nosleep")
-        posts = list(subreddit.hot(limit=40))  # Obtenemos más posts para tener margen
-        
-        # Contamos los posts procesados para evitar bucles infinitos
-        posts_procesados = 0
-        
-        for post in posts:
-            if len(historias) >= cantidad:
-                break
-                
-            # Si ya hemos procesado demasiados posts, salimos
-            posts_procesados += 1
-            if posts_procesados > 40:
-                print("⚠️ Se ha alcanzado el límite de posts procesados")
-                break
-                
-            # Si ya hemos consultado esta historia, la saltamos
-            if post.id in historias_consultadas:
-                continue
+        # Solo los posts no consultados y con texto son candidatos; las páginas
+        # se descargan a medida que la ventana de trabajos pide más posts y se
+        # ordenan por puntuación antes de traducir o reescribir nada
+        candidatos = candidatos_priorizados(
+            (
+                post
+                for post in posts
+                if post.id not in historias_consultadas and post.selftext
+            ),
+            cantidad,
+            validar=validar,
+            devolver=devolver,
+        )
 
-            if post.selftext:
-                titulo = post.title
-                historia = post.selftext
+        while True:
+            # Mantener la ventana llena, sin lanzar más posts de los que faltan
+            while len(en_curso) < min(max_concurrencia, cantidad - len(historias)):
+                post = next(candidatos, None)
+                if post is None:
+                    break
+                en_curso[executor.submit(procesar_post, post, cancelado)] = post
+
+            if not en_curso or len(historias) >= cantidad:
+                break
 
-                if not historia or historia.isspace():
-                    print("❌ El texto de la historia está vacío. Saltando al siguiente post...")
+            terminados, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+            for futuro in terminados:
+                del en_curso[futuro]
+                try:
+                    resultado = futuro.result()
+                except Exception as e:
+                    print(f"Error procesando post: {e}")
                     continue
+                if resultado and len(historias) < cantidad:
+                    historias.append(resultado)
 
-                print(f"🔄 Procesando historia: {titulo}")
-                
-                # Crear carpeta para la historia
-                historia_id, ruta = crear_carpeta_historia()
-                
-                # Detectar idioma y traducir si es necesario
-                idioma = detectar_idioma(historia)
-                if idioma != "es":
-                    print(f"🔍 Idioma detectado: {idioma}. Traduciendo al español...")
-                    titulo = traducir_a_espanol(titulo)
-                    historia = traducir_a_espanol(historia)
-                    print("✨ Mejorando la historia con DeepSeek...")                      
-                    historia_mejorada = mejorar_historia(titulo, historia)
-                
-                    if historia_mejorada:
-                        # Procesar la respuesta para eliminar los marcadores entre corchetes
-                        lineas = historia_mejorada.splitlines()
-                        
-                        # Filtrar líneas que contengan metadatos o formatos
-                        lineas_filtradas = []
-                        for linea in lineas:
-                            # Ignorar líneas con metadatos o formatos específicos
-                            if ("**Género" in linea or 
-                                "Recursos literarios" in linea or 
-                                "Terror psicológico" in linea or
-                                "misterio sobrenatural" in linea or
-                                "Presagios" in linea or
-                                "narrador poco fiable" in linea or
-                                "atmósfera claustrofóbica" in linea or
-                                "---" == linea.strip() or
-                                "[Género" in linea or
-                                "**Título" in linea):
-                                continue
-                            
-                            # Limpiar la línea de marcadores
-                            linea_limpia = linea.replace("[", "").replace("]", "").replace("*", "").strip()
-                            if linea_limpia:  # Solo añadir líneas no vacías
-                                lineas_filtradas.append(linea_limpia)
-                        
-                        # La primera línea debe ser el título, el resto es el contenido
-                        if lineas_filtradas:
-                            titulo_mejorado = lineas_filtradas[0].replace("Título mejorado:", "").strip()
-                            texto_mejorado = "\n".join(lineas_filtradas[1:]).replace("Texto mejorado:", "").strip()
-                        else:
-                            titulo_mejorado = titulo  # Usar el título original si no encontramos uno mejorado
-                            texto_mejorado = historia  # Usar la historia original si no encontramos una mejorada
-                            
-                        # Guardar los archivos
-                        with open(f"{ruta}/historia.txt", "w", encoding="utf-8") as f:
-                            # Guardamos solo el título y el texto mejorado, sin ningún formato
-                            f.write(f"{titulo_mejorado}\n{texto_mejorado}")
-
-                        with open(f"{ruta}/metadata.json", "w", encoding="utf-8") as f:
-                            json.dump(
-                                {
-                                    "id": historia_id,
-                                    "titulo": titulo_mejorado,
-                                    "ruta": ruta,
-                                },
-                                f,
-                            )
-
-                        with open(f"{ruta}/historia.json", "w", encoding="utf-8") as f:
-                            json.dump(
-                                {
-                                    "título": titulo_mejorado,
-                                    "historia": texto_mejorado,
-                                    "descripción": f"📖 {titulo_mejorado}\n\n¡Una historia de terror que te pondrá los pelos de punta! 😱",
-                                    "hashtags": "#terrorparanodormir #miedoyterror #historiasterror #terror #miedo #paranormal #relatos",
-                                },
-                                f,
-                                ensure_ascii=False,
-                                indent=4,
-                            )
-
-                        historias_consultadas.add(post.id)
-                        print(f"✅ Historia mejorada guardada en {ruta}")
-                        
-                        # Añadir la historia a la lista de historias procesadas
-                        historias.append((historia_id, titulo_mejorado, texto_mejorado))
-        
         print(f"✅ Se obtuvieron {len(historias)} historias de un total de {cantidad} solicitadas")
         return historias
     except Exception as e:
         print(f"Error obteniendo múltiples historias: {e}")
         return historias  # Devolvemos las historias que pudimos obtener
+    finally:
+        # Los posts que sigan en vuelo se abandonan antes de la reescritura
+        cancelado.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        if candidatos is not None:
+            candidatos.close()
+        # Cerrar el generador libera también el archivo de un volcado
+        if isinstance(posts, GeneratorType):
+            posts.close()
+        if devolver is not None and en_curso:
+            devolver(en_curso.values())
+
+
+def obtener_historias_de_volcado(
+    ruta_volcado,
+    cantidad=50,
+    max_concurrencia=None,
+    subreddits=None,
+    min_caracteres=None,
+    min_puntuacion=None,
+):
+    """Obtiene historias de un volcado de Reddit en lugar de la API
+
+    El volcado (JSONL, o NDJSON comprimido con zstd o gzip) se lee en
+    streaming y sus posts entran en el mismo camino que los de los listados:
+    preselección, duplicados, traducción y reescritura en paralelo. No hay
+    límite de peticiones a Reddit, solo la velocidad del disco.
+
+    Args:
+        ruta_volcado: Ruta del archivo de volcado
+        cantidad: Número de historias a obtener
+        max_concurrencia: Posts procesados simultáneamente
+        subreddits: Subreddits aceptados (por defecto VOLCADO_SUBREDDITS o
+            los de REDDIT_FUENTES)
+        min_caracteres: Longitud mínima del texto (VOLCADO_MIN_CARACTERES)
+        min_puntuacion: Puntuación mínima (VOLCADO_MIN_PUNTUACION)
+
+    Returns:
+        Lista de tuplas (historia_id, titulo, texto)
+    """
+    if subreddits is None:
+        definidos = os.getenv("VOLCADO_SUBREDDITS", "")
+        subreddits = [s.strip() for s in definidos.split(",") if s.strip()] or [
+            subreddit for subreddit, _, _ in cosechador.fuentes
+        ]
+    if min_caracteres is None:
+        min_caracteres = int(os.getenv("VOLCADO_MIN_CARACTERES", "1000"))
+    if min_puntuacion is None and os.getenv("VOLCADO_MIN_PUNTUACION"):
+        min_puntuacion = int(os.getenv("VOLCADO_MIN_PUNTUACION"))
 
+    print(f"📦 Leyendo historias del volcado {ruta_volcado} (r/{', r/'.join(subreddits)})")
+    posts = leer_volcado(
+        ruta_volcado,
+        subreddits=subreddits,
+        min_caracteres=min_caracteres,
+        min_puntuacion=min_puntuacion,
+    )
+    return obtener_multiples_historias(cantidad, max_concurrencia, posts=posts)
@@ -0,0 +1,124 @@
+import json
+import os
+
+# Tablas de cabecera MPEG Audio Layer III (kbps y Hz)
+_BITRATES_MPEG1 = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+_BITRATES_MPEG2 = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+_FRECUENCIAS = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],  # MPEG-2.5
+}
+
+
+def _saltar_id3(datos):
+    if datos[:3] == b"ID3" and len(datos) >= 10:
+        tamano = 0
+        for byte in datos[6:10]:
+            tamano = (tamano << 7) | (byte & 0x7F)
+        return 10 + tamano
+    return 0
+
+
+def duracion_mp3(ruta):
+    """Duración exacta en milisegundos de un mp3 (Layer III) recorriendo sus tramas
+
+    No necesita ffprobe: suma las muestras de cada trama. La trama de
+    cabecera Xing/Info (la que escribe ffmpeg) no contiene audio y no se
+    cuenta.
+    """
+    with open(ruta, "rb") as f:
+        datos = f.read()
+
+    posicion = _saltar_id3(datos)
+    muestras = 0
+    frecuencia = None
+    primera = True
+    while posicion + 4 <= len(datos):
+        cabecera = int.from_bytes(datos[posicion : posicion + 4], "big")
+        if cabecera >> 21 != 0x7FF:
+            posicion += 1  # Buscar la siguiente sincronía
+            continue
+        version = (cabecera >> 19) & 0b11
+        capa = (cabecera >> 17) & 0b11
+        indice_bitrate = (cabecera >> 12) & 0xF
+        indice_frecuencia = (cabecera >> 10) & 0b11
+        relleno = (cabecera >> 9) & 1
+        if version == 1 or capa != 0b01 or indice_bitrate in (0, 15) or indice_frecuencia == 3:
+            posicion += 1
+            continue
+
+        frecuencia = _FRECUENCIAS[version][indice_frecuencia]
+        if version == 3:
+            bitrate = _BITRATES_MPEG1[indice_bitrate] * 1000
+            muestras_trama = 1152
+            longitud = 144 * bitrate // frecuencia + relleno
+        else:
+            bitrate = _BITRATES_MPEG2[indice_bitrate] * 1000
+            muestras_trama = 576
+            longitud = 72 * bitrate // frecuencia + relleno
+
+        trama = datos[posicion : posicion + longitud]
+        if not (primera and (b"Xing" in trama or b"Info" in trama)):
+            muestras += muestras_trama
+        primera = False
+        posicion += longitud
+
+    if not frecuencia:
+        return 0.0
+    return muestras * 1000 / frecuencia
+
+
+def guardar_tiempos(ruta, palabras, inicios_ms, duraciones_ms, **extra):
+    """Guarda los tiempos por palabra en un JSON por columnas"""
+    datos = dict(
+        extra,
+        palabras=list(palabras),
+        inicio_ms=[round(valor, 1) for valor in inicios_ms],
+        duracion_ms=[round(valor, 1) for valor in duraciones_ms],
+    )
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temporal, ruta)
+
+
+def cargar_tiempos(ruta):
+    """Devuelve el diccionario de columnas (palabras, inicio_ms, duracion_ms)"""
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def unir_tiempos(rutas_tiempos, duraciones_ms, ruta_salida, crossfade_ms=0):
+    """Combina los tiempos de los segmentos en la línea de tiempo de la narración
+
+    Cada segmento se desplaza por la duración acumulada de los anteriores
+    (menos el fundido entre segmentos, si lo hay). El archivo resultante
+    incluye también el inicio de cada segmento.
+
+    Args:
+        rutas_tiempos: Archivos de tiempos de los segmentos, en orden
+        duraciones_ms: Duración de cada segmento en milisegundos
+        ruta_salida: Archivo de tiempos de la narración completa
+        crossfade_ms: Fundido usado al unir los audios
+    """
+    palabras, inicios, duraciones, inicios_segmentos = [], [], [], []
+    desplazamiento = 0.0
+    for i, (ruta, duracion) in enumerate(zip(rutas_tiempos, duraciones_ms)):
+        if i > 0:
+            desplazamiento -= crossfade_ms
+        inicios_segmentos.append(round(desplazamiento, 1))
+        tiempos = cargar_tiempos(ruta)
+        palabras += tiempos["palabras"]
+        inicios += [desplazamiento + inicio for inicio in tiempos["inicio_ms"]]
+        duraciones += tiempos["duracion_ms"]
+        desplazamiento += duracion
+
+    guardar_tiempos(
+        ruta_salida,
+        palabras,
+        inicios,
+        duraciones,
+        duracion_total_ms=round(desplazamiento, 1),
+        inicio_segmentos_ms=inicios_segmentos,
+    )
@@ -528,6 +528,71 @@ def integrar_audio_video(historia_id, ruta_videos_temp, modo_multiples=False):
         print(f"{Fore.RED}Detalles del error: {traceback.format_exc()}{Style.RESET_ALL}")
         return False
 
+def integrar_narracion_en_flujo(historia_id, ruta_video_temp):
+    """Genera la narración y la integra con el video mientras se sintetiza
+    
+    El audio de Edge TTS se escribe en la entrada estándar de un ffmpeg que ya
+    está codificando el video de fondo, así que el renderizado avanza a la vez
+    que la síntesis en lugar de esperar a narracion.mp3 (que se guarda igual).
+    La duración del audio no se conoce hasta el final, por eso el video se
+    repite sin límite y se corta con -shortest: solo sirve para el modo de un
+    video en bucle.
+    
+    Args:
+        historia_id: ID de la historia
+        ruta_video_temp: Ruta del video de fondo
+    
+    Returns:
+        Ruta del video final generado o False si hay error
+    """
+    if not verificar_ffmpeg():
+        return False
+    
+    from audio_generator import texto_a_audio
+    
+    ruta_historia = f"historias/{historia_id}"
+    ruta_video_final = os.path.abspath(os.path.join(ruta_historia, "video_integrado.mp4"))
+    video_vertical = convertir_a_vertical(ruta_video_temp)
+    
+    print(f"{Fore.YELLOW}🔄 Generando la narración e integrándola con el video a la vez...{Style.RESET_ALL}")
+    # Los errores de ffmpeg van a un archivo: una tubería que nadie lee durante
+    # la síntesis podría llenarse y bloquear a ffmpeg y a quien le escribe
+    errores = tempfile.TemporaryFile()
+    proceso = subprocess.Popen([
+        "ffmpeg", "-y", "-v", "error", "-nostats",
+        "-stream_loop", "-1", "-i", video_vertical,
+        "-f", "mp3", "-i", "pipe:0",
+        "-c:v", "libx264", "-preset", "medium", "-c:a", "aac", "-map", "0:v:0", "-map", "1:a:0",
+        "-shortest", ruta_video_final
+    ], stdin=subprocess.PIPE, stderr=errores)
+    
+    with errores:
+        try:
+            ruta_audio = texto_a_audio(historia_id, destino=proceso.stdin)
+        except Exception as e:
+            print(f"{Fore.RED}❌ Error al generar la narración: {str(e)}{Style.RESET_ALL}")
+            ruta_audio = None
+        
+        if not ruta_audio:
+            proceso.kill()
+            proceso.wait()
+            if os.path.exists(ruta_video_final):
+                os.remove(ruta_video_final)
+            return False
+        
+        # Al cerrar la entrada ffmpeg termina de codificar el último tramo
+        proceso.communicate()
+        if proceso.returncode != 0 or not os.path.exists(ruta_video_final):
+            errores.seek(0)
+            mensaje = errores.read().decode('utf-8', 'replace')
+            print(f"{Fore.RED}❌ Error al ejecutar ffmpeg: {mensaje}{Style.RESET_ALL}")
+            return False
+    
+    tamano_mb = os.path.getsize(ruta_video_final) / (1024*1024)
+    print(f"{Fore.GREEN}✅ Video con audio integrado generado: {ruta_video_final}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}ℹ️ Tamaño del archivo: {tamano_mb:.2f} MB{Style.RESET_ALL}")
+    return ruta_video_final
+
 def reproducir_video(ruta_video):
     """Reproduce el video generado"""
     try:
@@ -541,8 +606,12 @@ def reproducir_video(ruta_video):
         print(f"{Fore.RED}❌ Error al reproducir el video: {str(e)}{Style.RESET_ALL}")
         return False
 
-def integrar_video(historia_id):
-    """Flujo completo para integrar video con audio"""
+def integrar_video(historia_id, en_flujo=False):
+    """Flujo completo para integrar video con audio
+    
+    Con ``en_flujo`` la narración todavía no existe: se sintetiza aquí mismo
+    mientras ffmpeg codifica el video (ver integrar_narracion_en_flujo).
+    """
     if not historia_id:
         print(f"{Fore.RED}❌ No hay ninguna historia activa. Primero obtén una historia.{Style.RESET_ALL}")
         input("Presiona Enter para continuar...")
@@ -570,6 +639,13 @@ def integrar_video(historia_id):
         except ValueError:
             print(f"{Fore.RED}❌ Por favor, ingresa un número válido.{Style.RESET_ALL}")
     
+    if en_flujo and modo_multiples:
+        # Para elegir cuántos videos descargar hace falta la duración del audio
+        print(f"{Fore.YELLOW}⚠️ El modo de múltiples videos necesita la narración completa. Generándola primero...{Style.RESET_ALL}")
+        from audio_generator import texto_a_audio
+        texto_a_audio(historia_id)
+        en_flujo = False
+    
     # Paso 3: Obtener la duración del audio para el modo de múltiples videos
     duracion_audio = None
     if modo_multiples:
@@ -601,7 +677,16 @@ def integrar_video(historia_id):
         return False
         
     # Paso 5: Integrar audio con video(s)
-    ruta_video_final = integrar_audio_video(historia_id, rutas_videos, modo_multiples)
+    ruta_video_final = False
+    if en_flujo:
+        ruta_video_final = integrar_narracion_en_flujo(historia_id, rutas_videos)
+        if not ruta_video_final:
+            # Los segmentos ya sintetizados se reutilizan de la caché de audio
+            print(f"{Fore.YELLOW}⚠️ Generando la narración completa antes de integrarla...{Style.RESET_ALL}")
+            from audio_generator import texto_a_audio
+            texto_a_audio(historia_id)
+    if not ruta_video_final:
+        ruta_video_final = integrar_audio_video(historia_id, rutas_videos, modo_multiples)
     if not ruta_video_final:
         print(f"{Fore.RED}❌ No se pudo integrar el audio con el video.{Style.RESET_ALL}")
         input("Presiona Enter para continuar...")
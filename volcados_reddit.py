@@ -0,0 +1,74 @@
+import gzip
+import io
+import json
+
+from cliente_reddit import post_desde_json, post_valido
+
+# Ventana de descompresión de los volcados de Pushshift/Arctic Shift (2 GiB)
+VENTANA_MAXIMA_ZSTD = 2**31
+
+
+def _abrir_binario(ruta):
+    """Abre el volcado como flujo binario descomprimido según su extensión"""
+    if ruta.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError(
+                "Para leer volcados .zst instala zstandard: pip install zstandard"
+            )
+        archivo = open(ruta, "rb")
+        lector = zstandard.ZstdDecompressor(max_window_size=VENTANA_MAXIMA_ZSTD).stream_reader(
+            archivo, closefd=True
+        )
+        return io.BufferedReader(lector)
+    if ruta.endswith(".gz"):
+        return gzip.open(ruta, "rb")
+    return open(ruta, "rb")
+
+
+def leer_volcado(ruta, subreddits=None, min_caracteres=0, min_puntuacion=None):
+    """Genera posts de un volcado JSONL (o NDJSON comprimido con zstd o gzip)
+
+    El archivo se lee y descomprime línea a línea, así que la memoria usada no
+    depende de su tamaño. Antes de decodificar cada línea se descartan las que
+    no mencionan ninguno de los subreddits, y después se filtra por subreddit,
+    longitud del texto y puntuación. Los posts se entregan con los mismos
+    atributos que los de los listados para seguir el mismo camino de
+    procesamiento.
+
+    Args:
+        ruta: Archivo .jsonl/.ndjson, .zst o .gz
+        subreddits: Subreddits aceptados (sin distinguir mayúsculas) o None
+        min_caracteres: Longitud mínima del selftext
+        min_puntuacion: Puntuación mínima o None
+    """
+    permitidos = {s.lower() for s in subreddits} if subreddits else None
+    marcas = [s.lower().encode("utf-8") for s in subreddits] if subreddits else None
+    leidas = aceptadas = 0
+
+    with _abrir_binario(ruta) as flujo:
+        for linea in flujo:
+            leidas += 1
+            # Filtro barato sobre los bytes antes de decodificar el JSON
+            if marcas:
+                minusculas = linea.lower()
+                if not any(marca in minusculas for marca in marcas):
+                    continue
+            try:
+                datos = json.loads(linea)
+            except ValueError:
+                continue
+
+            if permitidos and str(datos.get("subreddit", "")).lower() not in permitidos:
+                continue
+            post = post_desde_json(datos)
+            if len(post.selftext or "") < min_caracteres or not post_valido(post):
+                continue
+            if min_puntuacion is not None and (post.score or 0) < min_puntuacion:
+                continue
+
+            aceptadas += 1
+            yield post
+
+    print(f"📦 Volcado {ruta}: {aceptadas} posts aceptados de {leidas} líneas")